@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+EZJob ingestion throughput benchmark
+Runs ingest_jobs() end to end without touching the live job boards:
+  python ingest_benchmark.py --scale 10000                  # synthetic upstream pages, in-memory store
+  python ingest_benchmark.py --scale 100000 --mongo-url mongodb://localhost:27017
+  python ingest_benchmark.py --record fixtures/http         # capture live responses once
+  python ingest_benchmark.py --fixtures fixtures/http       # replay them
+Reports postings/sec, per-stage time and peak RSS.
+"""
+
+import argparse
+import asyncio
+import copy
+import itertools
+import json
+import random
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+import server
+
+BENCHMARK_DB_NAME = "ezjob_benchmark"
+ARBEITNOW_PAGE_SIZE = 100
+
+# ── In-memory store ──────────────────────────────────────
+# Just enough of the Motor collection API for the ingestion path. Indexes declared through
+# create_index are real hash indexes (multikey for list fields), so lookups stay O(1) at 100k postings.
+def _matches(doc, query):
+    for field, cond in query.items():
+        if field == "$or":
+            if not any(_matches(doc, q) for q in cond):
+                return False
+        elif field == "$and":
+            if not all(_matches(doc, q) for q in cond):
+                return False
+        else:
+            value = doc.get(field)
+            values = value if isinstance(value, list) else [value]
+            if isinstance(cond, dict):
+                if "$in" in cond and not any(v in cond["$in"] for v in values):
+                    return False
+                if "$lt" in cond and (value is None or not value < cond["$lt"]):
+                    return False
+                if "$lte" in cond and (value is None or not value <= cond["$lte"]):
+                    return False
+            elif cond not in values:
+                return False
+    return True
+
+def _project(doc, projection):
+    if not projection:
+        return dict(doc)
+    included = [k for k, v in projection.items() if v and k != "_id"]
+    if included:
+        return {k: doc[k] for k in included if k in doc}
+    return {k: v for k, v in doc.items() if k not in projection}
+
+class MemoryCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def limit(self, n):
+        self.docs = self.docs[:n] if n else self.docs
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs[:length] if length else self.docs
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+class MemoryCollection:
+    def __init__(self):
+        self.docs = {}
+        self.indexes = {}
+        self.next_id = itertools.count()
+
+    async def create_index(self, keys, **options):
+        fields = (keys,) if isinstance(keys, str) else tuple(k for k, _ in keys)
+        index = self.indexes.setdefault(fields, {})
+        for doc_id, doc in self.docs.items():
+            for key in self._index_keys(fields, doc):
+                index.setdefault(key, set()).add(doc_id)
+
+    def _index_keys(self, fields, doc):
+        parts = []
+        for field in fields:
+            value = doc.get(field)
+            parts.append(value if isinstance(value, list) else [value])
+        return itertools.product(*parts)
+
+    def _reindex(self, doc_id, doc, add):
+        for fields, index in self.indexes.items():
+            for key in self._index_keys(fields, doc):
+                if add:
+                    index.setdefault(key, set()).add(doc_id)
+                else:
+                    index.get(key, set()).discard(doc_id)
+
+    def _candidates(self, query):
+        for fields, index in self.indexes.items():
+            options = []
+            for field in fields:
+                cond = query.get(field)
+                if isinstance(cond, dict) and list(cond) == ["$in"]:
+                    options.append(cond["$in"])
+                elif cond is not None and not isinstance(cond, dict):
+                    options.append([cond])
+                else:
+                    break
+            else:
+                ids = set()
+                for key in itertools.product(*options):
+                    ids |= index.get(key, set())
+                return sorted(ids)
+        return list(self.docs)
+
+    def _find(self, query):
+        return [doc_id for doc_id in self._candidates(query) if _matches(self.docs[doc_id], query)]
+
+    def find(self, query=None, projection=None):
+        return MemoryCursor([_project(self.docs[i], projection) for i in self._find(query or {})])
+
+    async def find_one(self, query=None, projection=None):
+        ids = self._find(query or {})
+        return _project(self.docs[ids[0]], projection) if ids else None
+
+    async def insert_one(self, doc):
+        self._insert(copy.copy(doc))
+
+    def _insert(self, doc):
+        doc_id = next(self.next_id)
+        doc.setdefault("_id", doc_id)
+        self.docs[doc_id] = doc
+        self._reindex(doc_id, doc, True)
+
+    def _apply(self, doc, update, inserting):
+        for field, value in update.get("$set", {}).items():
+            doc[field] = value
+        if inserting:
+            for field, value in update.get("$setOnInsert", {}).items():
+                doc[field] = value
+        for field, value in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + value
+
+    def _update(self, query, update, upsert):
+        ids = self._find(query)
+        if ids:
+            doc = self.docs[ids[0]]
+            self._reindex(ids[0], doc, False)
+            self._apply(doc, update, False)
+            self._reindex(ids[0], doc, True)
+        elif upsert:
+            doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+            self._apply(doc, update, True)
+            self._insert(doc)
+
+    async def update_one(self, query, update, upsert=False):
+        self._update(query, update, upsert)
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        ids = self._find(query)
+        if not ids:
+            return None
+        before = _project(self.docs[ids[0]], projection)
+        self._update({"_id": self.docs[ids[0]]["_id"]}, update, False)
+        return before
+
+    async def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            self._update(op._filter, op._doc, op._upsert)
+
+class MemoryDatabase:
+    def __init__(self):
+        self.collections = {}
+
+    def __getattr__(self, name):
+        return self.collections.setdefault(name, MemoryCollection())
+
+    __getitem__ = __getattr__
+
+# ── Synthetic upstream ───────────────────────────────────
+SENIORITY = ["Junior", "", "Senior", "Staff", "Lead", "Principal"]
+STACKS = ["Python", "Go", "Rust", "React", "Data", "Platform", "ML", "iOS", "Android", "DevOps", "Security", "Frontend", "Backend"]
+ROLES = ["Engineer", "Developer", "Scientist", "Analyst", "Architect", "SRE", "Designer"]
+WORDS = ["acme", "nimbus", "lattice", "quartz", "harbor", "orbit", "cobalt", "ember", "summit", "fjord", "vertex", "willow",
+         "pixel", "delta", "beacon", "canyon", "atlas", "meadow", "signal", "tundra", "zephyr", "prairie", "lumen", "cinder"]
+LOCATIONS = ["Remote", "Remote - US", "Remote - EU", "Berlin", "London", "Worldwide", "Toronto", "Remote (Americas)"]
+DESCRIPTION = ("We are hiring to build reliable distributed systems, own services end to end, review code, "
+               "mentor teammates and ship features to customers every week. ") * 6
+
+class SyntheticUpstream:
+    """Serves deterministic pages in each source's wire format; `scale` postings are split across the sources."""
+    def __init__(self, scale, seed=7, duplicate_ratio=0.05):
+        self.per_source = max(1, scale // len(server.JOB_SOURCES))
+        self.rng_seed = seed
+        self.duplicate_ratio = duplicate_ratio
+        self.base_ts = int(datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp())
+
+    def posting(self, source, i):
+        # A slice of postings reuse another source's title/company so near-duplicate linking has work to do
+        rng = random.Random(f"{self.rng_seed}:{source}:{i}")
+        if rng.random() < self.duplicate_ratio:
+            rng = random.Random(f"{self.rng_seed}:shared:{i}")
+        title = " ".join(filter(None, [rng.choice(SENIORITY), rng.choice(STACKS), rng.choice(ROLES)]))
+        company = f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {rng.randrange(10000)}"
+        return {"title": f"{title} {rng.randrange(1000)}", "company": company, "location": rng.choice(LOCATIONS),
+                "description": f"{title} at {company}. {DESCRIPTION}"}
+
+    def rss(self, source, start, count):
+        items = []
+        for i in range(start, start + count):
+            p = self.posting(source, i)
+            published = datetime.fromtimestamp(self.base_ts + i, timezone.utc).strftime("%a, %d %b %Y %H:%M:%S +0000")
+            title = f"{p['company']}: {p['title']}" if source == "weworkremotely" else p["title"]
+            items.append(f"<item><title>{title}</title><link>https://{source}.example/jobs/{i}</link>"
+                         f"<pubDate>{published}</pubDate><source>{p['company']}</source>"
+                         f"<description>{p['description']}</description></item>")
+        return f'<?xml version="1.0"?><rss version="2.0"><channel><title>{source}</title>{"".join(items)}</channel></rss>'
+
+    def handler(self, request):
+        host, path, params = request.url.host, request.url.path, request.url.params
+        n = self.per_source
+        if host == "remotive.com":
+            jobs = []
+            for i in range(1, n + 1):
+                p = self.posting("remotive", i)
+                jobs.append({"id": i, "url": f"https://remotive.com/jobs/{i}", "title": p["title"], "company_name": p["company"],
+                             "candidate_required_location": p["location"], "job_type": "full_time",
+                             "description": p["description"], "category": "Software Development", "tags": ["python"]})
+            return httpx.Response(200, json={"jobs": jobs})
+        if host == "weworkremotely.com":
+            feeds = len(server.WWR_FEED_URLS)
+            offset = [u.rsplit("/", 1)[-1] for u in server.WWR_FEED_URLS].index(path.rsplit("/", 1)[-1]) * (n // feeds)
+            return httpx.Response(200, text=self.rss("weworkremotely", offset, n // feeds))
+        if host == "hn.algolia.com" and path.endswith("/search"):
+            return httpx.Response(200, json={"hits": [{"objectID": "1"}]})
+        if host == "hn.algolia.com":
+            children = []
+            for i in range(1, n + 1):
+                p = self.posting("hackernews", i)
+                children.append({"id": i, "text": f"{p['company']} | {p['title']} | {p['location']}<p>{p['description']}"})
+            return httpx.Response(200, json={"id": 1, "children": children})
+        if host == "www.indeed.com":
+            per_query, start = n // 3, int(params.get("start", 0))
+            query_offset = ["remote developer", "remote software engineer", "remote data scientist"].index(params["q"]) * per_query
+            count = max(0, min(int(params.get("limit", server.INDEED_PAGE_SIZE)), per_query - start))
+            return httpx.Response(200, text=self.rss("indeed", query_offset + start, count))
+        if host == "www.linkedin.com":
+            per_query, start = n // 3, int(params.get("start", 0))
+            query_offset = ["remote software engineer", "remote developer", "remote data"].index(params["keywords"]) * per_query
+            cards = []
+            for i in range(query_offset + start, query_offset + min(start + server.LINKEDIN_PAGE_SIZE, per_query)):
+                p = self.posting("linkedin", i)
+                cards.append(f'<li><div class="base-card"><a href="https://www.linkedin.com/jobs/view/{i}">'
+                             f'<h3 class="base-search-card__title">{p["title"]}</h3>'
+                             f'<h4 class="base-search-card__subtitle">{p["company"]}</h4>'
+                             f'<span class="job-search-card__location">{p["location"]}</span></a></div></li>')
+            return httpx.Response(200, text="".join(cards))
+        if host == "www.arbeitnow.com":
+            page = int(params.get("page", 1))
+            start = (page - 1) * ARBEITNOW_PAGE_SIZE
+            data = []
+            for i in range(start, min(start + ARBEITNOW_PAGE_SIZE, n)):
+                p = self.posting("github_jobs", i)
+                data.append({"slug": f"job-{i}", "url": f"https://www.arbeitnow.com/jobs/{i}", "title": p["title"],
+                             "company_name": p["company"], "location": p["location"], "remote": "Remote" in p["location"],
+                             "description": p["description"], "tags": [], "created_at": self.base_ts + n - i})
+            more = start + ARBEITNOW_PAGE_SIZE < n
+            return httpx.Response(200, json={"data": data, "links": {"next": f"?page={page + 1}" if more else None}})
+        return httpx.Response(404)
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+async def run(args):
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        server.client = AsyncIOMotorClient(args.mongo_url)
+        await server.client.drop_database(args.db_name)
+        server.db = server.client[args.db_name]
+    else:
+        server.db = MemoryDatabase()
+    await server.ensure_indexes()
+
+    if args.record:
+        transport = server.RecordingTransport(args.record, httpx.AsyncHTTPTransport())
+    elif args.fixtures:
+        transport = server.ReplayTransport(args.fixtures)
+    else:
+        transport = httpx.MockTransport(SyntheticUpstream(args.scale).handler)
+    server.http_client = server.create_http_client(transport)
+    if not args.record:
+        # Budgets only cap live traffic; offline runs should drain everything the upstream offers
+        budget = max(args.scale, 1000)
+        server.SOURCE_PAGE_BUDGETS.update({name: budget for name, _ in server.JOB_SOURCES})
+        server.INGESTION_SOURCE_TIMEOUT = args.timeout
+
+    started = time.perf_counter()
+    result = await server.ingest_jobs()
+    wall = time.perf_counter() - started
+    await server.http_client.aclose()
+    if server.parse_executor:
+        server.parse_executor.shutdown()
+
+    totals = {k: sum(r.get(k, 0) for r in result["sources"]) for k in ("fetched", "inserted", "updated", "unchanged", "errored", "duplicates")}
+    report = {
+        "upstream": "record" if args.record else "fixtures" if args.fixtures else f"synthetic:{args.scale}",
+        "store": "mongo" if args.mongo_url else "memory",
+        "wall_seconds": round(wall, 3),
+        "postings_per_second": round(totals["fetched"] / wall, 1) if wall else 0.0,
+        # Per-phase work time from each source run's own instrumentation, summed across sources
+        "stage_seconds": {phase: round(sum(r.get(f"{phase}_ms", 0) for r in result["sources"]) / 1000, 3)
+                          for phase in server.INGESTION_PHASES},
+        "upstream_mb": round(sum(r.get("bytes_downloaded", 0) for r in result["sources"]) / (1024 * 1024), 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        **totals,
+        "sources": {r["source"]: {"status": r["status"], "fetched": r["fetched"], "duration_ms": r.get("duration_ms", 0)}
+                    for r in result["sources"]},
+    }
+    if args.mongo_url:
+        await server.client.drop_database(args.db_name)
+        server.client.close()
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end job ingestion offline")
+    parser.add_argument("--scale", type=int, default=10000, help="synthetic postings across all sources (default 10000)")
+    parser.add_argument("--fixtures", help="replay recorded responses from this directory instead of synthetic pages")
+    parser.add_argument("--record", help="fetch from the live sources once and save responses to this directory")
+    parser.add_argument("--mongo-url", help="run against this MongoDB instead of the in-memory store")
+    parser.add_argument("--db-name", default=BENCHMARK_DB_NAME, help="database to use (dropped before and after the run)")
+    parser.add_argument("--timeout", type=float, default=3600, help="per-source deadline in seconds")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"Upstream: {report['upstream']}  Store: {report['store']}")
+    print(f"Postings: {report['fetched']} fetched, {report['inserted']} inserted, {report['updated']} updated, "
+          f"{report['unchanged']} unchanged, {report['errored']} errored, {report['duplicates']} near-duplicates")
+    print(f"Wall time: {report['wall_seconds']}s  Throughput: {report['postings_per_second']} postings/sec")
+    print("Stage time (work time summed across sources): " + ", ".join(f"{k} {v}s" for k, v in report["stage_seconds"].items()))
+    print(f"Upstream bytes: {report['upstream_mb']} MB  Peak RSS: {report['peak_rss_mb']} MB")
+    for name, source in report["sources"].items():
+        print(f"  {name:<16} {source['status']:<10} {source['fetched']:>7} postings {source['duration_ms']:>8} ms")
+
+if __name__ == "__main__":
+    main()
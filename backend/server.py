@@ -1,22 +1,40 @@
 import os
 import uuid
+import copy
 import json
 import asyncio
 import hashlib
+import math
 import re
+import random
+import socket
+import base64
+import calendar
+import contextvars
+import time
+import fcntl
+import tempfile
+import importlib.util
+from pathlib import Path
 from datetime import datetime, timezone, timedelta
 from typing import Optional, List
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
 from io import BytesIO
+from collections import OrderedDict
 
 import httpx
-import resend
 import feedparser
+import numpy as np
 import pdfplumber
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Request, Response, Depends, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from pydantic import BaseModel
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 
@@ -28,21 +46,40 @@ EMERGENT_LLM_KEY = os.environ.get("EMERGENT_LLM_KEY")
 RESEND_API_KEY = os.environ.get("RESEND_API_KEY", "")
 SENDER_EMAIL = os.environ.get("SENDER_EMAIL", "onboarding@resend.dev")
 HIGH_SCORE_THRESHOLD = 80
-
-if RESEND_API_KEY:
-    resend.api_key = RESEND_API_KEY
+# Postings as returned by the API and fed to prompts: without the dedup and search index fields
+JOB_PROJECTION = {"_id": 0, "dedup_minhash": 0, "dedup_bands": 0, "search_tf": 0, "search_terms": 0, "title_tokens": 0,
+                  "feature_vec": 0}
+PROFILE_PROJECTION = {"_id": 0, "feature_vec": 0}
+MATCH_PROJECTION = {"_id": 0, "prepared_cover_letter": 0, "prepared_cover_letter_key": 0}
+LLM_PROVIDER, LLM_MODEL = "openai", "gpt-5.2"
+
+HTTP_MAX_CONNECTIONS = int(os.environ.get("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.environ.get("HTTP_MAX_KEEPALIVE", "20"))
+# "record" saves every upstream response under HTTP_FIXTURE_DIR, "replay" serves them back without network access
+HTTP_FIXTURE_MODE = os.environ.get("HTTP_FIXTURE_MODE", "live")
+HTTP_FIXTURE_DIR = Path(os.environ.get("HTTP_FIXTURE_DIR") or Path(__file__).parent / "fixtures" / "http")
 
 client: AsyncIOMotorClient = None
 db = None
+http_client: httpx.AsyncClient = None
 ingestion_task = None
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    global client, db, ingestion_task
-    client = AsyncIOMotorClient(MONGO_URL)
-    db = client[DB_NAME]
+ingestion_source_tasks = {}
+cover_letter_workers = []
+notification_workers = []
+# Strong references to fire-and-forget tasks; the event loop only holds weak ones, so an unreferenced task
+# can be garbage-collected mid-run. Entries drop out when the task finishes and the rest are cancelled on shutdown.
+background_tasks = set()
+
+def spawn_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def ensure_indexes():
     await db.job_postings.create_index([("source_name", 1), ("source_job_id", 1)], unique=True)
     await db.job_postings.create_index([("indexed_at", -1)])
+    await db.job_postings.create_index("dedup_bands")
     await db.users.create_index("email", unique=True)
     await db.users.create_index("user_id", unique=True)
     await db.user_sessions.create_index("session_token", unique=True)
@@ -53,15 +90,203 @@ async def lifespan(app: FastAPI):
     await db.application_attempts.create_index([("user_id", 1), ("job_posting_id", 1)])
     await db.notification_events.create_index([("user_id", 1), ("created_at", -1)])
     await db.notification_settings.create_index("user_id", unique=True)
+    await db.http_validators.create_index("url", unique=True)
+    await db.ingestion_state.create_index("source", unique=True)
+    await db.ingestion_runs.create_index([("completed_at", -1)])
+    await db.llm_cache.create_index("key", unique=True)
+    await db.matching_state.create_index("user_id", unique=True)
+    await db.matching_jobs.create_index("job_id", unique=True)
+    await db.matching_jobs.create_index([("user_id", 1), ("created_at", -1)])
+    await db.job_postings.create_index([("first_seen_at", -1)])
+    await db.job_postings.create_index([("feature_at", 1)])
+    await db.job_postings.create_index([("search_terms", 1), ("indexed_at", -1)])
+    await db.job_postings.create_index([("title_tokens", 1), ("indexed_at", -1)])
+    await db.job_postings.create_index("posting_id")
+    await db.search_df.create_index("term", unique=True)
+    await db.search_stats.create_index("name", unique=True)
+    await db.llm_cache.create_index("expires_at", expireAfterSeconds=0)
+    await db.cover_letter_jobs.create_index("key", unique=True)
+    await db.cover_letter_jobs.create_index([("status", 1), ("priority", -1), ("run_after", 1)])
+    await db.cover_letter_jobs.create_index("completed_at", expireAfterSeconds=COVER_LETTER_JOB_RETENTION_SECONDS)
+    await db.application_attempts.create_index("cover_letter_status")
+    await db.llm_budget.create_index([("purpose", 1), ("day", 1)], unique=True)
+    await db.candidate_contexts.create_index("user_id", unique=True)
+    await db.notification_outbox.create_index("idempotency_key", unique=True)
+    await db.notification_outbox.create_index([("status", 1), ("run_after", 1)])
+    await db.notification_outbox.create_index("completed_at", expireAfterSeconds=NOTIFICATION_RETENTION_SECONDS)
+    await db.match_results.create_index([("status", 1), ("score", -1)])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global client, db, http_client, ingestion_task, cover_letter_workers, notification_workers
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+    http_client = create_http_client()
+    await ensure_indexes()
     ingestion_task = asyncio.create_task(ingestion_loop())
+    spawn_background(backfill_search_index())
+    await requeue_stale_cover_letters()
+    spawn_background(enqueue_pending_prepared_cover_letters())
+    cover_letter_workers = [asyncio.create_task(cover_letter_worker()) for _ in range(COVER_LETTER_WORKERS)]
+    notification_workers = [asyncio.create_task(notification_worker()) for _ in range(NOTIFICATION_WORKERS)]
     yield
-    if ingestion_task:
-        ingestion_task.cancel()
+    tasks = [task for task in (ingestion_task, matching_task) if task]
+    tasks += [*ingestion_source_tasks.values(), *background_tasks, *cover_letter_workers, *notification_workers]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await http_client.aclose()
+    if parse_executor:
+        parse_executor.shutdown(wait=False, cancel_futures=True)
     client.close()
 
 app = FastAPI(lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
+# ── HTTP Client ──────────────────────────────────────────
+# Query params that change on every call and would otherwise defeat fixture lookup
+FIXTURE_IGNORED_PARAMS = {"numericFilters"}
+# Bodies are stored decoded, so transfer-level headers must not be replayed
+FIXTURE_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+def fixture_path(directory, request):
+    params = sorted((k, v) for k, v in request.url.params.multi_items() if k not in FIXTURE_IGNORED_PARAMS)
+    key = f"{request.method} {request.url.copy_with(query=None)} {params}"
+    return Path(directory) / f"{request.url.host}-{hashlib.sha256(key.encode()).hexdigest()[:24]}.json"
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, directory, inner):
+        self.directory = Path(directory)
+        self.inner = inner
+
+    async def handle_async_request(self, request):
+        response = await self.inner.handle_async_request(request)
+        body = await response.aread()
+        await response.aclose()
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in FIXTURE_DROPPED_HEADERS]
+        if response.status_code == 200:
+            fixture = {"method": request.method, "url": str(request.url), "status_code": response.status_code,
+                       "headers": headers, "body_b64": base64.b64encode(body).decode()}
+            await asyncio.to_thread(self._write, fixture_path(self.directory, request), fixture)
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    def _write(self, path, fixture):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(fixture))
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serves recorded fixtures; unknown requests get a 404, which fails that source's run like a live 404 would."""
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    async def handle_async_request(self, request):
+        path = fixture_path(self.directory, request)
+        if not path.exists():
+            return httpx.Response(404, request=request)
+        fixture = json.loads(await asyncio.to_thread(path.read_text))
+        return httpx.Response(fixture["status_code"], headers=fixture["headers"],
+                              content=base64.b64decode(fixture["body_b64"]), request=request)
+
+def create_http_client(transport=None):
+    # HTTP/2 comes from h2 (pinned in requirements.txt); an install without it falls back to pooled HTTP/1.1 keep-alive
+    http2 = importlib.util.find_spec("h2") is not None
+    limits = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE)
+    if transport is None and HTTP_FIXTURE_MODE == "replay":
+        transport = ReplayTransport(HTTP_FIXTURE_DIR)
+    elif transport is None and HTTP_FIXTURE_MODE == "record":
+        transport = RecordingTransport(HTTP_FIXTURE_DIR, httpx.AsyncHTTPTransport(http2=http2, limits=limits))
+    return httpx.AsyncClient(timeout=30, follow_redirects=True, http2=http2, limits=limits, transport=transport)
+
+def get_http_client():
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http_client = create_http_client()
+    return http_client
+
+async def conditional_get(url, params=None, headers=None):
+    """GET that revalidates with stored ETag/Last-Modified. Returns (response, validators); the response is
+    None when upstream answers 304, and validators are left for the caller to persist once the body is written."""
+    cache_key = str(httpx.URL(url, params=params))
+    req_headers = dict(headers or {})
+    # Recording skips revalidation so every fixture holds a full body
+    validators = None if HTTP_FIXTURE_MODE == "record" else await db.http_validators.find_one({"url": cache_key}, {"_id": 0})
+    if validators:
+        if validators.get("etag"):
+            req_headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            req_headers["If-Modified-Since"] = validators["last_modified"]
+    resp = await get_http_client().get(url, params=params, headers=req_headers)
+    if resp.status_code == 304:
+        return None, None
+    if resp.status_code == 200 and (resp.headers.get("etag") or resp.headers.get("last-modified")):
+        return resp, {"url": cache_key, "etag": resp.headers.get("etag"), "last_modified": resp.headers.get("last-modified")}
+    return resp, None
+
+async def save_http_validators(validators):
+    if not validators:
+        return
+    now = datetime.now(timezone.utc)
+    await db.http_validators.bulk_write([
+        UpdateOne({"url": v["url"]}, {"$set": {**v, "updated_at": now}}, upsert=True) for v in validators
+    ], ordered=False)
+
+# ── Metrics ──────────────────────────────────────────────
+# Minimal in-process registry rendered in Prometheus text format at /api/metrics; values are per process
+METRIC_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+METRICS = []
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, values)) + "}"
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self.values = {}
+        METRICS.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{format_labels(self.labels, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=METRIC_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        self.values = {}
+        METRICS.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        series = self.values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self.values.items()):
+            for bound, n in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{format_labels(self.labels + ('le',), key + (bound,))} {n}")
+            lines.append(f"{self.name}_bucket{format_labels(self.labels + ('le',), key + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {count}")
+        return lines
+
+def render_metrics():
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
 # ── Pydantic Models ──────────────────────────────────────
 class UserPreferencesUpdate(BaseModel):
     desired_titles: Optional[List[str]] = None
@@ -119,8 +344,7 @@ async def exchange_session(request: Request, response: Response):
     session_id = request.headers.get("X-Session-ID") or request.query_params.get("session_id")
     if not session_id:
         raise HTTPException(status_code=400, detail="session_id required")
-    async with httpx.AsyncClient(timeout=15) as hc:
-        resp = await hc.get("https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data", headers={"X-Session-ID": session_id})
+    resp = await get_http_client().get("https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data", headers={"X-Session-ID": session_id}, timeout=15)
     if resp.status_code != 200:
         raise HTTPException(status_code=401, detail="Invalid session_id")
     data = resp.json()
@@ -168,7 +392,7 @@ async def update_preferences(body: UserPreferencesUpdate, user=Depends(get_curre
 # ── Candidate Profile ───────────────────────────────────
 @app.get("/api/profile")
 async def get_profile(user=Depends(get_current_user)):
-    profile = await db.candidate_profiles.find_one({"user_id": user["user_id"]}, {"_id": 0})
+    profile = await db.candidate_profiles.find_one({"user_id": user["user_id"]}, PROFILE_PROJECTION)
     if not profile:
         profile = {"user_id": user["user_id"], "full_name": user.get("name", ""), "phone": None, "linkedin_url": None, "github_url": None, "years_experience": None, "summary": None, "resume_text": None, "resume_filename": None}
     return profile
@@ -178,8 +402,14 @@ async def update_profile(body: CandidateProfileUpdate, user=Depends(get_current_
     update_data = {k: v for k, v in body.dict().items() if v is not None}
     update_data["user_id"] = user["user_id"]
     update_data["updated_at"] = datetime.now(timezone.utc)
+    previous = await db.candidate_profiles.find_one({"user_id": user["user_id"]}, {"_id": 0, **{f: 1 for f in CANDIDATE_CONTEXT_FIELDS}}) or {}
     await db.candidate_profiles.update_one({"user_id": user["user_id"]}, {"$set": update_data}, upsert=True)
-    return await db.candidate_profiles.find_one({"user_id": user["user_id"]}, {"_id": 0})
+    # Contact details and links are not in the digest; rebuilding it would void every cached score and letter
+    if any(f in update_data and update_data[f] != previous.get(f) for f in CANDIDATE_CONTEXT_FIELDS):
+        await invalidate_candidate_context(user["user_id"])
+    if "summary" in update_data:
+        await refresh_profile_vector(user["user_id"])
+    return await db.candidate_profiles.find_one({"user_id": user["user_id"]}, PROFILE_PROJECTION)
 
 # ── Resume Upload & PDF Parsing ─────────────────────────
 @app.post("/api/resume/upload")
@@ -216,6 +446,8 @@ async def upload_resume(file: UploadFile = File(...), user=Depends(get_current_u
         }},
         upsert=True,
     )
+    await invalidate_candidate_context(user["user_id"])
+    await refresh_profile_vector(user["user_id"])
     word_count = len(extracted_text.split())
     return {"status": "ok", "filename": file.filename, "word_count": word_count, "text_preview": extracted_text[:500]}
 
@@ -225,6 +457,8 @@ async def delete_resume(user=Depends(get_current_user)):
         {"user_id": user["user_id"]},
         {"$set": {"resume_text": None, "resume_filename": None, "resume_uploaded_at": None, "updated_at": datetime.now(timezone.utc)}},
     )
+    await invalidate_candidate_context(user["user_id"])
+    await refresh_profile_vector(user["user_id"])
     return {"status": "ok"}
 
 # ── Notification Settings ────────────────────────────────
@@ -261,31 +495,56 @@ async def test_notification(user=Depends(get_current_user)):
     return {"status": "sent", "results": results}
 
 # ── Notification Senders ─────────────────────────────────
+# Both channels go through the shared pooled HTTP client; Resend is called over its REST API for that reason.
+RESEND_EMAILS_URL = "https://api.resend.com/emails"
+
+class DeliveryError(Exception):
+    def __init__(self, message, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.retryable, self.retry_after = retryable, retry_after
+
+def raise_for_delivery(resp, message, retry_after=None):
+    # Rate limiting and provider outages are worth retrying; other 4xx (bad address, blocked bot) are not
+    if resp.status_code == 429 or resp.status_code >= 500:
+        raise DeliveryError(message, retry_after=retry_after)
+    raise DeliveryError(message, retryable=False)
+
+async def deliver_email(to_email, subject, html_content):
+    resp = await get_http_client().post(
+        RESEND_EMAILS_URL, headers={"Authorization": f"Bearer {RESEND_API_KEY}"},
+        json={"from": SENDER_EMAIL, "to": [to_email], "subject": subject, "html": html_content}, timeout=10,
+    )
+    if resp.status_code >= 400:
+        raise_for_delivery(resp, f"Resend HTTP {resp.status_code}: {resp.text[:200]}", float(resp.headers.get("retry-after") or 0) or None)
+    return {"email_id": resp.json().get("id")}
+
+async def deliver_telegram(bot_token, chat_id, text):
+    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+    resp = await get_http_client().post(url, json={"chat_id": chat_id, "text": text, "parse_mode": "HTML"}, timeout=10)
+    result = resp.json()
+    if not result.get("ok"):
+        raise_for_delivery(resp, f"Telegram: {result.get('description', resp.status_code)}", (result.get("parameters") or {}).get("retry_after"))
+    return {"message_id": result.get("result", {}).get("message_id")}
+
 async def send_email_notification(user_id, to_email, subject, html_content):
     if not RESEND_API_KEY:
         await log_notification(user_id, "email", "skipped", {"reason": "RESEND_API_KEY not configured", "to": to_email, "subject": subject})
         return {"status": "skipped", "reason": "Email service not configured (RESEND_API_KEY missing)"}
     try:
-        params = {"from": SENDER_EMAIL, "to": [to_email], "subject": subject, "html": html_content}
-        email_resp = await asyncio.to_thread(resend.Emails.send, params)
-        email_id = email_resp.get("id") if isinstance(email_resp, dict) else getattr(email_resp, "id", None)
-        await log_notification(user_id, "email", "sent", {"to": to_email, "subject": subject, "email_id": email_id})
-        return {"status": "sent", "email_id": email_id}
+        result = await deliver_email(to_email, subject, html_content)
+        await log_notification(user_id, "email", "sent", {"to": to_email, "subject": subject, **result})
+        return {"status": "sent", **result}
     except Exception as e:
         await log_notification(user_id, "email", "failed", {"to": to_email, "error": str(e)})
         return {"status": "failed", "error": str(e)}
 
 async def send_telegram_notification(bot_token, chat_id, text, user_id):
     try:
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        async with httpx.AsyncClient(timeout=10) as hc:
-            resp = await hc.post(url, json={"chat_id": chat_id, "text": text, "parse_mode": "HTML"})
-        result = resp.json()
-        status = "sent" if result.get("ok") else "failed"
-        await log_notification(user_id, "telegram", status, {"chat_id": chat_id, "response": result})
-        return {"status": status, "message_id": result.get("result", {}).get("message_id") if result.get("ok") else None}
+        result = await deliver_telegram(bot_token, chat_id, text)
+        await log_notification(user_id, "telegram", "sent", {"chat_id": chat_id, **result})
+        return {"status": "sent", **result}
     except Exception as e:
-        await log_notification(user_id, "telegram", "failed", {"error": str(e)})
+        await log_notification(user_id, "telegram", "failed", {"chat_id": chat_id, "error": str(e)})
         return {"status": "failed", "error": str(e)}
 
 async def log_notification(user_id, channel, status, payload):
@@ -296,6 +555,8 @@ async def log_notification(user_id, channel, status, payload):
     })
 
 async def notify_high_score_matches(user_id, matches_with_jobs):
+    """Writes one outbox message per enabled channel for each high-score match; delivery happens in the
+    notification workers. Idempotency keys make a repeated call for the same match a no-op."""
     high_scores = [m for m in matches_with_jobs if m.get("score", 0) >= HIGH_SCORE_THRESHOLD]
     if not high_scores:
         return
@@ -303,6 +564,7 @@ async def notify_high_score_matches(user_id, matches_with_jobs):
     if not settings:
         return
 
+    messages = []
     for match in high_scores:
         job = match.get("job", {})
         title = job.get("title", "Unknown Position")
@@ -322,23 +584,212 @@ async def notify_high_score_matches(user_id, matches_with_jobs):
                 </div>
                 <p style="color:#71717A;font-size:12px;margin:16px 0 0;">You're receiving this because your match score threshold is {HIGH_SCORE_THRESHOLD}+</p>
             </div>"""
-            await send_email_notification(user_id, settings["email_address"], f"EZJob: {score}/100 Match - {title} at {company}", html)
+            messages.append((f"match:{match['match_id']}:email", "email",
+                             {"subject": f"EZJob: {score}/100 Match - {title} at {company}", "html": html}))
 
         if settings.get("telegram_enabled") and settings.get("telegram_bot_token") and settings.get("telegram_chat_id"):
             link_html = f'<a href="{url}">View Job</a>' if url else ''
             msg = f"<b>New High-Score Match!</b>\n\n<b>{title}</b>\n{company}\n\nScore: <b>{score}/100</b>\n{link_html}"
-            await send_telegram_notification(settings["telegram_bot_token"], settings["telegram_chat_id"], msg, user_id)
+            messages.append((f"match:{match['match_id']}:telegram", "telegram", {"text": msg}))
+
+    try:
+        await enqueue_notifications(user_id, messages)
+    except Exception as e:
+        print(f"Notification enqueue error: {e}")
+
+# ── Leased Queues ────────────────────────────────────────
+# Shared mechanics of the Mongo-backed work queues (notification_outbox, cover_letter_jobs). Documents move from
+# "queued" to the queue's running status under a per-process lease, and go back to "queued" with a later
+# run_after to be retried; a crashed worker's lease expires and its document becomes claimable again. Writes
+# after a claim match on lease_owner and attempts, so a worker whose lease expired cannot overwrite the new owner.
+class LeasedQueue:
+    def __init__(self, collection, id_field, running_status, lease_seconds, poll_seconds, sort):
+        self.collection_name, self.id_field, self.running_status = collection, id_field, running_status
+        self.lease_seconds, self.poll_seconds, self.sort = lease_seconds, poll_seconds, sort
+        self.wakeup = asyncio.Event()
+
+    @property
+    def collection(self):
+        return db[self.collection_name]
+
+    async def claim(self, query=None, due_only=True):
+        """Claims the next runnable document; due_only=False also takes a queued one still waiting for its run_after."""
+        now = datetime.now(timezone.utc)
+        queued = {"status": "queued", "run_after": {"$lte": now}} if due_only else {"status": "queued"}
+        return await self.collection.find_one_and_update(
+            {**(query or {}), "$or": [queued, {"status": self.running_status, "lease_expires_at": {"$lt": now}}]},
+            {"$set": {"status": self.running_status, "lease_owner": INSTANCE_ID,
+                      "lease_expires_at": now + timedelta(seconds=self.lease_seconds), "updated_at": now},
+             "$inc": {"attempts": 1}},
+            sort=self.sort, projection={"_id": 0}, return_document=ReturnDocument.AFTER,
+        )
+
+    def owned(self, doc):
+        return {self.id_field: doc[self.id_field], "lease_owner": INSTANCE_ID, "attempts": doc["attempts"]}
+
+    async def requeue(self, doc, delay, fields=None, count_attempt=True):
+        now = datetime.now(timezone.utc)
+        update = {"$set": {"status": "queued", "run_after": now + timedelta(seconds=delay), "lease_owner": None,
+                           "lease_expires_at": None, "updated_at": now, **(fields or {})}}
+        if not count_attempt:
+            update["$inc"] = {"attempts": -1}
+        return await self.collection.update_one(self.owned(doc), update)
+
+    async def complete(self, doc, status, fields=None):
+        now = datetime.now(timezone.utc)
+        return await self.collection.update_one(
+            self.owned(doc), {"$set": {"status": status, "completed_at": now, "updated_at": now, **(fields or {})}})
+
+    async def run_worker(self, process):
+        """Claims documents one at a time and hands each to process(doc), which completes or requeues it."""
+        while True:
+            try:
+                self.wakeup.clear()
+                doc = await self.claim()
+                if doc is None:
+                    try:
+                        await asyncio.wait_for(self.wakeup.wait(), timeout=self.poll_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await process(doc)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"{self.collection_name} worker error: {e}")
+                await asyncio.sleep(self.poll_seconds)
+
+# ── Notification Outbox ──────────────────────────────────
+# notification_outbox holds one document per message, unique by idempotency key. Workers claim due messages
+# under a lease and send them through token buckets: one for email (the provider's request rate), one per
+# Telegram bot token (30 msg/s) and one per Telegram chat (1 msg/s). A message whose bucket is empty reserves
+# the next slot and goes back to the queue until then, so a burst to one chat never ties up the workers.
+# Failures are retried with backoff, honouring the provider's retry-after; permanent errors fail at once.
+# Buckets are per process, and only the NOTIFICATION_BUCKET_LIMIT most recently used are kept.
+NOTIFICATION_WORKERS = int(os.environ.get("NOTIFICATION_WORKERS", "8"))
+NOTIFICATION_MAX_ATTEMPTS = int(os.environ.get("NOTIFICATION_MAX_ATTEMPTS", "5"))
+NOTIFICATION_RETRY_BASE_SECONDS = float(os.environ.get("NOTIFICATION_RETRY_BASE_SECONDS", "10"))
+NOTIFICATION_LEASE_SECONDS = 120
+NOTIFICATION_POLL_SECONDS = 5
+NOTIFICATION_RETENTION_SECONDS = 7 * 24 * 3600
+NOTIFICATION_BUCKET_LIMIT = 10000
+EMAIL_SENDS_PER_SECOND = float(os.environ.get("EMAIL_SENDS_PER_SECOND", "2"))
+TELEGRAM_BOT_SENDS_PER_SECOND = 30
+TELEGRAM_CHAT_SENDS_PER_SECOND = 1
+NOTIFICATIONS = Counter("ezjob_notifications_total", "Outbox notifications by channel and outcome", ("channel", "outcome"))
+NOTIFICATION_DELIVERY_SECONDS = Histogram("ezjob_notification_delivery_seconds", "Time from enqueue to delivery", ("channel",))
+notification_queue = LeasedQueue("notification_outbox", "outbox_id", "sending", NOTIFICATION_LEASE_SECONDS, NOTIFICATION_POLL_SECONDS,
+                                  [("run_after", 1)])
+notification_buckets = OrderedDict()
+
+class NotificationDeferred(Exception):
+    """Raised before sending when a rate limit has no token; the message is requeued for its reserved slot."""
+    def __init__(self, delay):
+        super().__init__(f"rate limited for {delay:.2f}s")
+        self.delay = delay
+
+def notification_bucket(key, rate):
+    if key not in notification_buckets:
+        notification_buckets[key] = TokenBucket(rate, max(rate, 1))
+        # An evicted chat has been idle the longest, so its bucket would have refilled anyway
+        while len(notification_buckets) > NOTIFICATION_BUCKET_LIMIT:
+            notification_buckets.popitem(last=False)
+    notification_buckets.move_to_end(key)
+    return notification_buckets[key]
+
+def reserve_notification_slot(message, *buckets):
+    """Takes a token from every bucket, or raises NotificationDeferred with the wait for the reserved slot.
+    A message that already holds a reservation sends without taking again."""
+    if message.get("rate_reserved"):
+        return
+    delay = max(bucket.reserve() for bucket in buckets)
+    if delay > 0:
+        raise NotificationDeferred(delay)
+
+async def enqueue_notifications(user_id, messages):
+    """messages are (idempotency_key, channel, content) tuples."""
+    if not messages:
+        return
+    now = datetime.now(timezone.utc)
+    ops = [UpdateOne(
+        {"idempotency_key": key},
+        {"$setOnInsert": {"idempotency_key": key, "outbox_id": f"out_{uuid.uuid4().hex[:12]}", "user_id": user_id, "channel": channel,
+                          "content": content, "status": "queued", "attempts": 0, "run_after": now, "lease_expires_at": None,
+                          "created_at": now}},
+        upsert=True,
+    ) for key, channel, content in messages]
+    await db.notification_outbox.bulk_write(ops, ordered=False)
+    notification_queue.wakeup.set()
+
+async def deliver_notification(message):
+    """Sends one outbox message to the user's current channel settings; returns None when the channel is off."""
+    settings = await db.notification_settings.find_one({"user_id": message["user_id"]}, {"_id": 0}) or {}
+    content = message["content"]
+    if message["channel"] == "email":
+        if not (RESEND_API_KEY and settings.get("email_enabled") and settings.get("email_address")):
+            return None
+        reserve_notification_slot(message, notification_bucket("email", EMAIL_SENDS_PER_SECOND))
+        return {"to": settings["email_address"], **await deliver_email(settings["email_address"], content["subject"], content["html"])}
+    bot_token, chat_id = settings.get("telegram_bot_token"), settings.get("telegram_chat_id")
+    if not (settings.get("telegram_enabled") and bot_token and chat_id):
+        return None
+    bot_key = hashlib.sha256(bot_token.encode()).hexdigest()[:16]
+    reserve_notification_slot(message, notification_bucket(f"telegram:{bot_key}", TELEGRAM_BOT_SENDS_PER_SECOND),
+                              notification_bucket(f"telegram:{bot_key}:{chat_id}", TELEGRAM_CHAT_SENDS_PER_SECOND))
+    return {"chat_id": chat_id, **await deliver_telegram(bot_token, chat_id, content["text"])}
+
+async def finish_notification(message, status, detail=None, retry_after=None):
+    now = datetime.now(timezone.utc)
+    if status == "deferred":
+        # Waiting for a rate-limit slot is not a failed attempt
+        await notification_queue.requeue(message, retry_after, {"rate_reserved": True}, count_attempt=False)
+    elif status == "retry":
+        delay = max(retry_after or 0, NOTIFICATION_RETRY_BASE_SECONDS * 2 ** (message["attempts"] - 1))
+        await notification_queue.requeue(message, delay, {"rate_reserved": False, "last_error": detail.get("error")})
+    else:
+        await notification_queue.complete(message, status, {"result": detail})
+        await log_notification(message["user_id"], message["channel"], status, detail or {})
+        if status == "sent":
+            NOTIFICATION_DELIVERY_SECONDS.observe((now - message["created_at"].replace(tzinfo=timezone.utc)).total_seconds(), channel=message["channel"])
+    NOTIFICATIONS.inc(channel=message["channel"], outcome=status)
+
+async def process_notification(message):
+    try:
+        result = await deliver_notification(message)
+    except NotificationDeferred as e:
+        await finish_notification(message, "deferred", retry_after=e.delay)
+    except Exception as e:
+        retryable = getattr(e, "retryable", True) and message["attempts"] < NOTIFICATION_MAX_ATTEMPTS
+        await finish_notification(message, "retry" if retryable else "failed", {"error": str(e)}, getattr(e, "retry_after", None))
+    else:
+        await finish_notification(message, "sent" if result is not None else "skipped", result or {"reason": "channel disabled"})
+
+async def notification_worker():
+    await notification_queue.run_worker(process_notification)
 
 # ── Job Postings ─────────────────────────────────────────
 @app.get("/api/jobs")
 async def list_jobs(limit: int = 50, skip: int = 0, user=Depends(get_current_user)):
-    jobs = await db.job_postings.find({}, {"_id": 0}).sort("indexed_at", -1).skip(skip).limit(limit).to_list(limit)
+    jobs = await db.job_postings.find({}, JOB_PROJECTION).sort("indexed_at", -1).skip(skip).limit(limit).to_list(limit)
     total = await db.job_postings.count_documents({})
     return {"jobs": jobs, "total": total}
 
+@app.get("/api/jobs/search")
+async def search_jobs(q: str, remote: Optional[bool] = None, limit: int = 50, skip: int = 0, user=Depends(get_current_user)):
+    # Comma-separated alternatives, each matching titles that contain all of its words
+    query = title_search_query([part for part in q.split(",") if part.strip()])
+    if not query:
+        raise HTTPException(status_code=400, detail="Search query has no searchable words")
+    query["duplicate_of"] = None
+    if remote is not None:
+        query["is_remote"] = remote
+    limit = max(1, min(limit, 100))
+    jobs = await db.job_postings.find(query, JOB_PROJECTION).sort("indexed_at", -1).skip(skip).limit(limit).to_list(limit)
+    return {"jobs": jobs, "query": q}
+
 @app.get("/api/jobs/{posting_id}")
 async def get_job(posting_id: str, user=Depends(get_current_user)):
-    job = await db.job_postings.find_one({"posting_id": posting_id}, {"_id": 0})
+    job = await db.job_postings.find_one({"posting_id": posting_id}, JOB_PROJECTION)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     return job
@@ -349,11 +800,11 @@ async def list_matches(limit: int = 50, status: Optional[str] = None, user=Depen
     query = {"user_id": user["user_id"]}
     if status:
         query["status"] = status
-    matches = await db.match_results.find(query, {"_id": 0}).sort("score", -1).limit(limit).to_list(limit)
+    matches = await db.match_results.find(query, MATCH_PROJECTION).sort("score", -1).limit(limit).to_list(limit)
     job_ids = list(set(m.get("job_posting_id") for m in matches if m.get("job_posting_id")))
     jobs_map = {}
     if job_ids:
-        jobs_cursor = db.job_postings.find({"posting_id": {"$in": job_ids}}, {"_id": 0})
+        jobs_cursor = db.job_postings.find({"posting_id": {"$in": job_ids}}, JOB_PROJECTION)
         async for job in jobs_cursor:
             jobs_map[job["posting_id"]] = job
     for m in matches:
@@ -362,10 +813,10 @@ async def list_matches(limit: int = 50, status: Optional[str] = None, user=Depen
 
 @app.get("/api/matches/{match_id}")
 async def get_match(match_id: str, user=Depends(get_current_user)):
-    match = await db.match_results.find_one({"match_id": match_id, "user_id": user["user_id"]}, {"_id": 0})
+    match = await db.match_results.find_one({"match_id": match_id, "user_id": user["user_id"]}, MATCH_PROJECTION)
     if not match:
         raise HTTPException(status_code=404, detail="Match not found")
-    job = await db.job_postings.find_one({"posting_id": match.get("job_posting_id")}, {"_id": 0})
+    job = await db.job_postings.find_one({"posting_id": match.get("job_posting_id")}, JOB_PROJECTION)
     match["job"] = job
     return match
 
@@ -378,40 +829,168 @@ async def match_action(match_id: str, body: MatchAction, user=Depends(get_curren
         raise HTTPException(status_code=404, detail="Match not found")
     await db.match_results.update_one({"match_id": match_id}, {"$set": {"status": body.action + "d", "updated_at": datetime.now(timezone.utc)}})
     if body.action == "approve":
-        job = await db.job_postings.find_one({"posting_id": match["job_posting_id"]}, {"_id": 0})
-        profile = await db.candidate_profiles.find_one({"user_id": user["user_id"]}, {"_id": 0})
+        job = await db.job_postings.find_one({"posting_id": match["job_posting_id"]}, JOB_PROJECTION)
+        # A letter prepared ahead of time is used only if the prompt it was written from is still current. Only the
+        # stored digest is consulted, so approving never waits on the model; a missing digest counts as stale
+        prepared = None
+        if match.get("prepared_cover_letter"):
+            profile = await db.candidate_profiles.find_one({"user_id": user["user_id"]}, PROFILE_PROJECTION)
+            context = await stored_candidate_context(user["user_id"], profile) if profile else None
+            if context is not None and cover_letter_cache_key({**profile, "context": context}, job, match) == match.get("prepared_cover_letter_key"):
+                prepared = match["prepared_cover_letter"]
         attempt_id = f"app_{uuid.uuid4().hex[:12]}"
         await db.application_attempts.insert_one({
             "attempt_id": attempt_id, "user_id": user["user_id"], "job_posting_id": match["job_posting_id"],
             "match_id": match_id, "status": "ready", "job_url": job.get("source_url", "") if job else "",
             "job_title": job.get("title", "") if job else "", "company_name": job.get("company_name", "") if job else "",
-            "cover_letter": None, "cover_letter_status": "generating",
+            "cover_letter": prepared, "cover_letter_status": "ready" if prepared else "generating",
             "created_at": datetime.now(timezone.utc), "updated_at": datetime.now(timezone.utc),
         })
-        # Generate cover letter in background
-        asyncio.create_task(generate_cover_letter_bg(attempt_id, user["user_id"], profile, job, match))
-        return {"status": "approved", "application": {"attempt_id": attempt_id, "job_url": job.get("source_url", "") if job else ""}}
+        if not prepared:
+            await enqueue_cover_letter(attempt_id, user["user_id"])
+        return {"status": "approved", "application": {"attempt_id": attempt_id, "job_url": job.get("source_url", "") if job else "",
+                                                      "cover_letter_status": "ready" if prepared else "generating"}}
     return {"status": "rejected"}
 
-# ── Cover Letter Generation ──────────────────────────────
-async def generate_cover_letter_bg(attempt_id, user_id, profile, job, match):
+# ── Cover Letter Queue ───────────────────────────────────
+# Approvals enqueue a job in cover_letter_jobs; a fixed pool of workers claims jobs by priority under a lease,
+# so bulk approvals drain at a steady rate and work held by a crashed process is picked up once its lease
+# expires. LLM failures are retried with backoff; the last attempt accepts the template letter, so every
+# application ends up "ready" (or "failed" if the job itself keeps erroring).
+# Pending matches at or above HIGH_SCORE_THRESHOLD also get a "prepare" job at the lowest priority, so idle
+# workers write their letter ahead of approval under a daily LLM budget; approving then attaches it at once.
+COVER_LETTER_WORKERS = int(os.environ.get("COVER_LETTER_WORKERS", "4"))
+COVER_LETTER_LEASE_SECONDS = float(os.environ.get("COVER_LETTER_LEASE_SECONDS", "300"))
+COVER_LETTER_MAX_ATTEMPTS = int(os.environ.get("COVER_LETTER_MAX_ATTEMPTS", "4"))
+COVER_LETTER_RETRY_BASE_SECONDS = float(os.environ.get("COVER_LETTER_RETRY_BASE_SECONDS", "30"))
+COVER_LETTER_POLL_SECONDS = 5
+COVER_LETTER_JOB_RETENTION_SECONDS = 7 * 24 * 3600
+COVER_LETTER_PRIORITY_APPROVED = 10
+COVER_LETTER_PRIORITY_SPECULATIVE = 0
+COVER_LETTER_SPECULATIVE_DAILY_BUDGET = int(os.environ.get("COVER_LETTER_SPECULATIVE_DAILY_BUDGET", "200"))
+COVER_LETTER_SPECULATIVE_MAX_AGE_DAYS = 7
+COVER_LETTER_JOBS = Counter("ezjob_cover_letter_jobs_total", "Cover letter queue jobs by outcome", ("outcome",))
+cover_letter_queue = LeasedQueue("cover_letter_jobs", "job_id", "running", COVER_LETTER_LEASE_SECONDS, COVER_LETTER_POLL_SECONDS,
+                                  [("priority", -1), ("run_after", 1)])
+
+async def enqueue_cover_letter_job(key, fields, priority):
+    now = datetime.now(timezone.utc)
+    await db.cover_letter_jobs.update_one(
+        {"key": key},
+        {"$setOnInsert": {"key": key, "job_id": f"cljob_{uuid.uuid4().hex[:12]}", **fields, "priority": priority, "status": "queued",
+                          "attempts": 0, "run_after": now, "lease_owner": None, "lease_expires_at": None, "created_at": now, "updated_at": now}},
+        upsert=True,
+    )
+    cover_letter_queue.wakeup.set()
+
+async def enqueue_cover_letter(attempt_id, user_id, priority=COVER_LETTER_PRIORITY_APPROVED):
+    await enqueue_cover_letter_job(f"application:{attempt_id}", {"kind": "application", "attempt_id": attempt_id, "user_id": user_id}, priority)
+
+async def enqueue_prepared_cover_letters(matches):
+    if not EMERGENT_LLM_KEY:
+        return
     try:
-        cover_letter = await generate_cover_letter(profile, job, match)
-        await db.application_attempts.update_one(
-            {"attempt_id": attempt_id},
-            {"$set": {"cover_letter": cover_letter, "cover_letter_status": "ready", "updated_at": datetime.now(timezone.utc)}},
-        )
+        for match in matches:
+            if match.get("score", 0) >= HIGH_SCORE_THRESHOLD:
+                await enqueue_cover_letter_job(f"match:{match['match_id']}", {"kind": "prepare", "match_id": match["match_id"],
+                                               "user_id": match["user_id"]}, COVER_LETTER_PRIORITY_SPECULATIVE)
     except Exception as e:
-        print(f"Cover letter generation error: {e}")
-        await db.application_attempts.update_one(
-            {"attempt_id": attempt_id},
-            {"$set": {"cover_letter_status": "failed", "updated_at": datetime.now(timezone.utc)}},
-        )
+        print(f"Prepared cover letter enqueue error: {e}")
 
-async def generate_cover_letter(profile, job, match):
-    if not EMERGENT_LLM_KEY:
-        return fallback_cover_letter(profile, job)
+async def enqueue_pending_prepared_cover_letters():
+    """Sweeps recent high-score pending matches that have no prepared letter yet, best first."""
+    try:
+        since = datetime.now(timezone.utc) - timedelta(days=COVER_LETTER_SPECULATIVE_MAX_AGE_DAYS)
+        matches = await db.match_results.find(
+            {"status": "pending", "score": {"$gte": HIGH_SCORE_THRESHOLD}, "prepared_cover_letter": None, "created_at": {"$gt": since}},
+            {"_id": 0, "match_id": 1, "user_id": 1, "score": 1},
+        ).sort("score", -1).limit(COVER_LETTER_SPECULATIVE_DAILY_BUDGET).to_list(COVER_LETTER_SPECULATIVE_DAILY_BUDGET)
+    except Exception as e:
+        print(f"Prepared cover letter sweep error: {e}")
+        return
+    await enqueue_prepared_cover_letters(matches)
+
+async def requeue_stale_cover_letters():
+    """Enqueues applications stuck at "generating" without a queue job, e.g. approved before the queue existed.
+    Jobs abandoned mid-run need nothing here: their expired lease makes them claimable again."""
+    try:
+        async for attempt in db.application_attempts.find({"cover_letter_status": "generating"}, {"_id": 0, "attempt_id": 1, "user_id": 1}):
+            await enqueue_cover_letter(attempt["attempt_id"], attempt["user_id"])
+    except Exception as e:
+        print(f"Cover letter requeue error: {e}")
+
+async def claim_cover_letter_job(key=None, due_only=True):
+    """Claims the next runnable job; due_only=False also takes a queued job still waiting out its retry backoff."""
+    return await cover_letter_queue.claim({"key": key} if key else None, due_only)
+
+async def run_cover_letter_job(job):
+    if job.get("kind") == "prepare":
+        return await prepare_cover_letter(job)
+    attempt = await db.application_attempts.find_one({"attempt_id": job["attempt_id"]}, {"_id": 0})
+    # A stream may already have written the letter while this job sat in backoff
+    if not attempt or attempt.get("cover_letter_status") == "ready":
+        return
+    profile = await get_candidate_profile(attempt["user_id"])
+    posting = await db.job_postings.find_one({"posting_id": attempt["job_posting_id"]}, JOB_PROJECTION)
+    match = await db.match_results.find_one({"match_id": attempt.get("match_id")}, {"_id": 0})
+    final = job["attempts"] >= COVER_LETTER_MAX_ATTEMPTS
+    cover_letter = await generate_cover_letter(profile, posting, match, fallback=final)
+    await db.application_attempts.update_one(
+        {"attempt_id": job["attempt_id"], "cover_letter_status": {"$ne": "ready"}},
+        {"$set": {"cover_letter": cover_letter, "cover_letter_status": "ready", "updated_at": datetime.now(timezone.utc)}},
+    )
+
+async def prepare_cover_letter(job):
+    match = await db.match_results.find_one({"match_id": job["match_id"]}, {"_id": 0})
+    if not EMERGENT_LLM_KEY or not match or match.get("status") != "pending":
+        return
+    profile = await get_candidate_profile(match["user_id"])
+    posting = await db.job_postings.find_one({"posting_id": match["job_posting_id"]}, JOB_PROJECTION)
+    if not posting:
+        return
+    key = cover_letter_cache_key(profile, posting, match)
+    if match.get("prepared_cover_letter_key") == key:
+        return
+    # Only letters the model actually has to write count against the budget
+    cover_letter = await llm_cache_get("cover_letter", key)
+    if not cover_letter:
+        if not await reserve_llm_budget("speculative_cover_letter", COVER_LETTER_SPECULATIVE_DAILY_BUDGET):
+            COVER_LETTER_JOBS.inc(outcome="over_budget")
+            return
+        cover_letter = await generate_cover_letter(profile, posting, match, fallback=False)
+    await db.match_results.update_one(
+        {"match_id": match["match_id"], "status": "pending"},
+        {"$set": {"prepared_cover_letter": cover_letter, "prepared_cover_letter_key": key, "prepared_at": datetime.now(timezone.utc)}},
+    )
 
+async def finish_cover_letter_job(job, error=None):
+    if error is None:
+        await cover_letter_queue.complete(job, "done")
+        COVER_LETTER_JOBS.inc(outcome="done")
+    elif job["attempts"] >= COVER_LETTER_MAX_ATTEMPTS:
+        result = await cover_letter_queue.complete(job, "failed", {"last_error": str(error)})
+        if result.modified_count and job.get("attempt_id"):
+            await db.application_attempts.update_one(
+                {"attempt_id": job["attempt_id"]}, {"$set": {"cover_letter_status": "failed", "updated_at": datetime.now(timezone.utc)}})
+        COVER_LETTER_JOBS.inc(outcome="failed")
+    else:
+        await cover_letter_queue.requeue(job, COVER_LETTER_RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1), {"last_error": str(error)})
+        COVER_LETTER_JOBS.inc(outcome="retried")
+
+async def process_cover_letter_job(job):
+    try:
+        await run_cover_letter_job(job)
+    except Exception as e:
+        print(f"Cover letter job {job['job_id']} error: {e}")
+        await finish_cover_letter_job(job, e)
+    else:
+        await finish_cover_letter_job(job)
+
+async def cover_letter_worker():
+    await cover_letter_queue.run_worker(process_cover_letter_job)
+
+# ── Cover Letter Generation ──────────────────────────────
+def cover_letter_prompt(profile, job, match):
     candidate_parts = []
     if profile:
         if profile.get("full_name"):
@@ -420,7 +999,9 @@ async def generate_cover_letter(profile, job, match):
             candidate_parts.append(f"Experience: {profile['years_experience']} years")
         if profile.get("summary"):
             candidate_parts.append(f"Summary: {profile['summary']}")
-        if profile.get("resume_text"):
+        if profile.get("context"):
+            candidate_parts.extend(context_prompt_lines(profile["context"]))
+        elif profile.get("resume_text"):
             candidate_parts.append(f"Resume:\n{profile['resume_text'][:3000]}")
 
     job_parts = []
@@ -455,18 +1036,36 @@ Requirements:
 - Keep under 400 words
 - Do NOT include placeholder text like [Your Name] — use the candidate's actual name if available
 - Do NOT include addresses or dates — just the letter body"""
+    return prompt
+
+def cover_letter_cache_key(profile, job, match):
+    return llm_cache_key("cover_letter", LLM_MODEL, cover_letter_prompt(profile, job, match))
+
+async def generate_cover_letter(profile, job, match, refresh=False, fallback=True):
+    """refresh skips the cache lookup (explicit regenerate) but still stores the new letter.
+    With fallback=False an LLM failure raises instead of returning the template letter, so the caller can retry."""
+    if not EMERGENT_LLM_KEY:
+        LLM_FALLBACKS.inc(purpose="cover_letter")
+        return fallback_cover_letter(profile, job)
 
+    prompt = cover_letter_prompt(profile, job, match)
+    cache_key = llm_cache_key("cover_letter", LLM_MODEL, prompt)
+    if not refresh and (cached := await llm_cache_get("cover_letter", cache_key)):
+        return cached
     try:
-        chat = LlmChat(
-            api_key=EMERGENT_LLM_KEY,
-            session_id=f"cover_{uuid.uuid4().hex[:8]}",
-            system_message="You are a professional career coach. Write tailored, compelling cover letters that highlight the candidate's relevant strengths.",
+        response = await llm_complete(
+            "cover_letter",
+            "You are a professional career coach. Write tailored, compelling cover letters that highlight the candidate's relevant strengths.",
+            prompt,
         )
-        chat.with_model("openai", "gpt-5.2")
-        response = await chat.send_message(UserMessage(text=prompt))
-        return response.strip()
+        cover_letter = response.strip()
+        await llm_cache_set("cover_letter", cache_key, cover_letter)
+        return cover_letter
     except Exception as e:
         print(f"Cover letter LLM error: {e}")
+        if not fallback:
+            raise
+        LLM_FALLBACKS.inc(purpose="cover_letter")
         return fallback_cover_letter(profile, job)
 
 def fallback_cover_letter(profile, job):
@@ -491,24 +1090,25 @@ def fallback_cover_letter(profile, job):
 
 @app.post("/api/cover-letter/generate")
 async def generate_cover_letter_endpoint(match_id: str = None, attempt_id: str = None, user=Depends(get_current_user)):
-    profile = await db.candidate_profiles.find_one({"user_id": user["user_id"]}, {"_id": 0})
+    profile = await get_candidate_profile(user["user_id"])
     job = None
     match = None
 
     if match_id:
         match = await db.match_results.find_one({"match_id": match_id, "user_id": user["user_id"]}, {"_id": 0})
         if match:
-            job = await db.job_postings.find_one({"posting_id": match.get("job_posting_id")}, {"_id": 0})
+            job = await db.job_postings.find_one({"posting_id": match.get("job_posting_id")}, JOB_PROJECTION)
     elif attempt_id:
         attempt = await db.application_attempts.find_one({"attempt_id": attempt_id, "user_id": user["user_id"]}, {"_id": 0})
         if attempt:
-            job = await db.job_postings.find_one({"posting_id": attempt.get("job_posting_id")}, {"_id": 0})
+            job = await db.job_postings.find_one({"posting_id": attempt.get("job_posting_id")}, JOB_PROJECTION)
             match = await db.match_results.find_one({"match_id": attempt.get("match_id")}, {"_id": 0})
 
     if not job:
         raise HTTPException(status_code=404, detail="Job not found for this match/application")
 
-    cover_letter = await generate_cover_letter(profile, job, match)
+    # This endpoint backs the "Regenerate" button, so it always asks the model for a fresh letter
+    cover_letter = await generate_cover_letter(profile, job, match, refresh=True)
 
     if attempt_id:
         await db.application_attempts.update_one(
@@ -528,6 +1128,62 @@ async def get_cover_letter(attempt_id: str, user=Depends(get_current_user)):
         "status": attempt.get("cover_letter_status", "none"),
     }
 
+COVER_LETTER_STREAM_WORDS = 12  # words per chunk event
+COVER_LETTER_STREAM_WAIT_SECONDS = 1  # how often a stream re-reads an application a worker is generating
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.get("/api/applications/{attempt_id}/cover-letter/stream")
+async def stream_cover_letter(attempt_id: str, refresh: bool = False, user=Depends(get_current_user)):
+    """Server-sent events for one application's cover letter: a status event right away, then the letter
+    as chunk events, then done with the full text. Replaces polling the GET endpoint while it is generated.
+    refresh=true asks the model for a new letter (the Regenerate button)."""
+    attempt = await db.application_attempts.find_one({"attempt_id": attempt_id, "user_id": user["user_id"]}, {"_id": 0})
+    if not attempt:
+        raise HTTPException(status_code=404, detail="Application not found")
+
+    async def events():
+        current = attempt
+        yield sse_event("status", {"status": "generating" if refresh else current.get("cover_letter_status", "none")})
+        # The application's queued job is claimed by this stream whatever its backoff, so the queue never writes
+        # a second letter over this one; a dropped connection leaves it to the workers once the lease expires.
+        # A job a worker is already running is waited for, unless a new letter was asked for anyway
+        job = await claim_cover_letter_job(f"application:{attempt_id}", due_only=False)
+        if not refresh and current.get("cover_letter_status") == "generating":
+            deadline = time.monotonic() + COVER_LETTER_LEASE_SECONDS
+            while not job and time.monotonic() < deadline and await db.cover_letter_jobs.count_documents(
+                    {"key": f"application:{attempt_id}", "status": "running"}):
+                yield ": waiting\n\n"
+                await asyncio.sleep(COVER_LETTER_STREAM_WAIT_SECONDS)
+            current = await db.application_attempts.find_one({"attempt_id": attempt_id}, {"_id": 0}) or current
+
+        cover_letter = None if refresh else current.get("cover_letter")
+        if not cover_letter:
+            profile = await get_candidate_profile(user["user_id"])
+            posting = await db.job_postings.find_one({"posting_id": current.get("job_posting_id")}, JOB_PROJECTION)
+            match = await db.match_results.find_one({"match_id": current.get("match_id")}, {"_id": 0})
+            try:
+                cover_letter = await generate_cover_letter(profile, posting, match, refresh=refresh, fallback=False)
+            except Exception:
+                LLM_FALLBACKS.inc(purpose="cover_letter")
+                yield sse_event("status", {"status": "fallback"})
+                cover_letter = fallback_cover_letter(profile, posting)
+            await db.application_attempts.update_one(
+                {"attempt_id": attempt_id},
+                {"$set": {"cover_letter": cover_letter, "cover_letter_status": "ready", "updated_at": datetime.now(timezone.utc)}},
+            )
+        if job:
+            await finish_cover_letter_job(job)
+
+        # The LLM SDK returns whole replies, so the letter is chunked here once it exists
+        words = cover_letter.split(" ")
+        for i in range(0, len(words), COVER_LETTER_STREAM_WORDS):
+            yield sse_event("chunk", {"text": " ".join(words[i:i + COVER_LETTER_STREAM_WORDS]) + (" " if i + COVER_LETTER_STREAM_WORDS < len(words) else "")})
+        yield sse_event("done", {"status": "ready", "cover_letter": cover_letter})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # ── Applications ─────────────────────────────────────────
 @app.get("/api/applications")
 async def list_applications(user=Depends(get_current_user)):
@@ -555,11 +1211,11 @@ async def get_dashboard(user=Depends(get_current_user)):
     applied = await db.application_attempts.count_documents({"user_id": uid, "status": "applied"})
     ready = await db.application_attempts.count_documents({"user_id": uid, "status": "ready"})
     total_jobs = await db.job_postings.count_documents({})
-    recent_matches = await db.match_results.find({"user_id": uid}, {"_id": 0}).sort("created_at", -1).limit(5).to_list(5)
+    recent_matches = await db.match_results.find({"user_id": uid}, MATCH_PROJECTION).sort("created_at", -1).limit(5).to_list(5)
     rm_job_ids = list(set(m.get("job_posting_id") for m in recent_matches if m.get("job_posting_id")))
     rm_jobs_map = {}
     if rm_job_ids:
-        async for job in db.job_postings.find({"posting_id": {"$in": rm_job_ids}}, {"_id": 0}):
+        async for job in db.job_postings.find({"posting_id": {"$in": rm_job_ids}}, JOB_PROJECTION):
             rm_jobs_map[job["posting_id"]] = job
     for m in recent_matches:
         m["job"] = rm_jobs_map.get(m.get("job_posting_id"))
@@ -632,7 +1288,7 @@ async def get_analytics(user=Depends(get_current_user)):
     top_job_ids = list(set(m.get("job_posting_id") for m in top_matches if m.get("job_posting_id")))
     top_jobs_map = {}
     if top_job_ids:
-        async for job in db.job_postings.find({"posting_id": {"$in": top_job_ids}}, {"_id": 0}):
+        async for job in db.job_postings.find({"posting_id": {"$in": top_job_ids}}, JOB_PROJECTION):
             top_jobs_map[job["posting_id"]] = job
     for m in top_matches:
         m["job"] = top_jobs_map.get(m.get("job_posting_id"))
@@ -660,59 +1316,512 @@ async def get_analytics(user=Depends(get_current_user)):
         "notifications": {"total": notif_count, "sent": notif_sent},
     }
 
+# ── LLM Gateway ──────────────────────────────────────────
+# Every model call goes through llm_complete: one process-wide concurrency cap, request and token buckets sized
+# to the provider's per-minute limits, a per-call timeout, and a circuit breaker that makes callers fall back
+# immediately while the provider keeps failing instead of each waiting out its own timeout.
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+LLM_REQUESTS_PER_MINUTE = float(os.environ.get("LLM_REQUESTS_PER_MINUTE", "300"))
+LLM_TOKENS_PER_MINUTE = float(os.environ.get("LLM_TOKENS_PER_MINUTE", "200000"))
+LLM_CALL_TIMEOUT = float(os.environ.get("LLM_CALL_TIMEOUT", "60"))
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.environ.get("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+LLM_COMPLETION_TOKEN_ESTIMATE = 600  # reserved per call for the response, which is not known up front
+LLM_CALLS = Counter("ezjob_llm_calls_total", "LLM calls by purpose and outcome", ("purpose", "outcome"))
+LLM_CALL_SECONDS = Histogram("ezjob_llm_call_duration_seconds", "LLM call latency, including time queued for capacity", ("purpose",))
+LLM_FALLBACKS = Counter("ezjob_llm_fallbacks_total", "Results served by the non-LLM fallback", ("purpose",))
+
+class LlmUnavailable(Exception):
+    pass
+
+class TokenBucket:
+    """Waits until `amount` tokens are available; refills at `rate` tokens per second up to `capacity`.
+    Waiters are served in arrival order because the lock is held while sleeping."""
+    def __init__(self, rate, capacity):
+        self.rate, self.capacity = rate, capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def reserve(self, amount=1):
+        """Takes `amount` tokens without waiting, going into debt if needed; returns the seconds until the
+        reserved tokens would have been available (0 when they were available now)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= min(amount, self.capacity)
+        return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+class CircuitBreaker:
+    """Opens after `failures` consecutive errors; after the cooldown calls are let through again and
+    the first success closes it, while another failure reopens it for a new cooldown."""
+    def __init__(self, failures, cooldown_seconds):
+        self.threshold, self.cooldown = failures, cooldown_seconds
+        self.failures = 0
+        self.opened_at = None
+
+    def allow(self):
+        return self.opened_at is None or time.monotonic() - self.opened_at >= self.cooldown
+
+    def record(self, ok):
+        if ok:
+            self.failures, self.opened_at = 0, None
+            return
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+llm_request_bucket = TokenBucket(LLM_REQUESTS_PER_MINUTE / 60, LLM_REQUESTS_PER_MINUTE / 6)
+llm_token_bucket = TokenBucket(LLM_TOKENS_PER_MINUTE / 60, LLM_TOKENS_PER_MINUTE / 6)
+llm_breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_COOLDOWN_SECONDS)
+
+def reject_if_breaker_open(purpose):
+    if not llm_breaker.allow():
+        LLM_CALLS.inc(purpose=purpose, outcome="rejected")
+        raise LlmUnavailable("LLM circuit breaker is open")
+
+async def llm_complete(purpose, system_message, prompt):
+    """Returns the model's reply text; raises LlmUnavailable when the breaker is open, or the call's own error."""
+    if not EMERGENT_LLM_KEY:
+        raise LlmUnavailable("EMERGENT_LLM_KEY is not set")
+    start = time.perf_counter()
+    reject_if_breaker_open(purpose)
+    async with llm_semaphore:
+        # Re-checked after queueing: the breaker may have opened while this call waited for a slot
+        reject_if_breaker_open(purpose)
+        await llm_request_bucket.acquire()
+        await llm_token_bucket.acquire((len(system_message) + len(prompt)) // 4 + LLM_COMPLETION_TOKEN_ESTIMATE)
+        try:
+            chat = LlmChat(api_key=EMERGENT_LLM_KEY, session_id=f"{purpose}_{uuid.uuid4().hex[:8]}", system_message=system_message)
+            chat.with_model(LLM_PROVIDER, LLM_MODEL)
+            response = await asyncio.wait_for(chat.send_message(UserMessage(text=prompt)), timeout=LLM_CALL_TIMEOUT)
+        except Exception as e:
+            llm_breaker.record(False)
+            LLM_CALLS.inc(purpose=purpose, outcome="timeout" if isinstance(e, asyncio.TimeoutError) else "error")
+            LLM_CALL_SECONDS.observe(time.perf_counter() - start, purpose=purpose)
+            raise
+    llm_breaker.record(True)
+    LLM_CALLS.inc(purpose=purpose, outcome="ok")
+    LLM_CALL_SECONDS.observe(time.perf_counter() - start, purpose=purpose)
+    return response
+
+async def reserve_llm_budget(purpose, daily_limit):
+    """Takes one call from a per-purpose daily allowance in llm_budget; False once the day's allowance is used."""
+    day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    try:
+        # Past the limit the filter no longer matches and the upsert collides with the day's document
+        await db.llm_budget.update_one({"purpose": purpose, "day": day, "used": {"$lt": daily_limit}}, {"$inc": {"used": 1}}, upsert=True)
+    except DuplicateKeyError:
+        return False
+    return True
+
+# ── LLM Cache ────────────────────────────────────────────
+# Model outputs keyed by a hash of the prompt inputs, so unchanged inputs never cost another call.
+# Entries live in llm_cache (TTL index on expires_at) behind a per-process LRU; fallbacks are never cached.
+LLM_CACHE_TTL_SECONDS = int(os.environ.get("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_LRU_SIZE = int(os.environ.get("LLM_CACHE_LRU_SIZE", "2048"))
+LLM_CACHE_HITS = Counter("ezjob_llm_cache_hits_total", "LLM cache hits by kind and tier", ("kind", "tier"))
+LLM_CACHE_MISSES = Counter("ezjob_llm_cache_misses_total", "LLM cache misses by kind", ("kind",))
+
+class LruCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, deadline = entry
+        if deadline <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl_seconds):
+        self.entries[key] = (value, time.monotonic() + ttl_seconds)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+llm_lru = LruCache(LLM_CACHE_LRU_SIZE)
+
+def llm_cache_key(kind, *parts):
+    return f"{kind}:{hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()}"
+
+async def llm_cache_get_many(kind, keys):
+    found = {}
+    for key in keys:
+        value = llm_lru.get(key)
+        if value is not None:
+            found[key] = copy.deepcopy(value)
+            LLM_CACHE_HITS.inc(kind=kind, tier="memory")
+    remaining = [key for key in keys if key not in found]
+    if remaining:
+        try:
+            now = datetime.now(timezone.utc)
+            async for doc in db.llm_cache.find({"key": {"$in": remaining}, "expires_at": {"$gt": now}},
+                                               {"_id": 0, "key": 1, "value": 1, "expires_at": 1}):
+                expires_at = doc["expires_at"].replace(tzinfo=timezone.utc)
+                llm_lru.set(doc["key"], copy.deepcopy(doc["value"]), (expires_at - now).total_seconds())
+                found[doc["key"]] = doc["value"]
+                LLM_CACHE_HITS.inc(kind=kind, tier="mongo")
+        except Exception as e:
+            print(f"LLM cache read error: {e}")
+    LLM_CACHE_MISSES.inc(len([key for key in keys if key not in found]), kind=kind)
+    return found
+
+async def llm_cache_get(kind, key):
+    return (await llm_cache_get_many(kind, [key])).get(key)
+
+async def llm_cache_set(kind, key, value):
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=LLM_CACHE_TTL_SECONDS)
+    llm_lru.set(key, copy.deepcopy(value), LLM_CACHE_TTL_SECONDS)
+    try:
+        await db.llm_cache.update_one(
+            {"key": key},
+            {"$set": {"key": key, "kind": kind, "value": value, "created_at": now, "expires_at": expires_at}},
+            upsert=True,
+        )
+    except Exception as e:
+        print(f"LLM cache write error: {e}")
+
 # ── LLM Matching (with resume support) ──────────────────
+MATCHING_MAX_JOBS = int(os.environ.get("MATCHING_MAX_JOBS", "25"))
+# Postings per scoring prompt; the candidate block is sent once per batch instead of once per job
+MATCHING_BATCH_SIZE = int(os.environ.get("MATCHING_BATCH_SIZE", "5"))
+# BM25 retrieval: query = desired-title terms (weighted) plus the most frequent summary/resume terms
+MATCHING_TITLE_QUERY_WEIGHT = 3
+MATCHING_PROFILE_QUERY_TERMS = 20
+MATCHING_QUERY_TERMS = 32
+MATCHING_FALLBACK_SCAN_LIMIT = 1000  # newest title matches examined before the search index exists
+MATCHING_POSTINGS_PER_TERM = int(os.environ.get("MATCHING_POSTINGS_PER_TERM", "500"))
+
+async def score_batch(prefs, profile, jobs):
+    # Concurrency, rate limits and timeouts are enforced by llm_complete
+    try:
+        return await score_matches_with_llm(prefs, profile, jobs)
+    except Exception as e:
+        print(f"LLM scoring error: {e}")
+        LLM_FALLBACKS.inc(len(jobs), purpose="match_score")
+        return fallback_score_batch(prefs, profile, jobs)
+
 @app.post("/api/matching/run")
 async def run_matching(user=Depends(get_current_user)):
+    """Queues a full matching run for the caller and returns a handle to poll at /api/matching/jobs/{job_id}."""
     uid = user["user_id"]
     prefs = await db.user_preferences.find_one({"user_id": uid}, {"_id": 0})
-    profile = await db.candidate_profiles.find_one({"user_id": uid}, {"_id": 0})
     if not prefs or not prefs.get("desired_titles"):
         raise HTTPException(status_code=400, detail="Set your job preferences first (desired titles)")
+    now = datetime.now(timezone.utc)
+    existing = await db.matching_jobs.find_one(
+        {"user_id": uid, "status": {"$in": ["queued", "running"]}, "created_at": {"$gt": now - timedelta(seconds=MATCHING_JOB_TIMEOUT)}},
+        {"_id": 0, "job_id": 1, "status": 1},
+    )
+    if existing:
+        return existing
+    job = {"job_id": f"mjob_{uuid.uuid4().hex[:12]}", "user_id": uid, "status": "queued", "result": None, "created_at": now}
+    await db.matching_jobs.insert_one(job)
+    spawn_background(run_matching_job(job["job_id"], uid))
+    return {"job_id": job["job_id"], "status": "queued"}
+
+@app.get("/api/matching/jobs/{job_id}")
+async def get_matching_job(job_id: str, user=Depends(get_current_user)):
+    job = await db.matching_jobs.find_one({"job_id": job_id, "user_id": user["user_id"]}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Matching job not found")
+    # A job whose process died never finishes; report it instead of leaving the client polling forever
+    if job["status"] in ("queued", "running") and \
+            job["created_at"].replace(tzinfo=timezone.utc) < datetime.now(timezone.utc) - timedelta(seconds=MATCHING_JOB_TIMEOUT):
+        job["status"] = "failed"
+        job["error"] = "Matching job did not finish"
+    return job
 
-    already_matched_ids = set()
-    async for m in db.match_results.find({"user_id": uid}, {"job_posting_id": 1, "_id": 0}):
-        already_matched_ids.add(m["job_posting_id"])
+async def run_matching_job(job_id, uid):
+    await db.matching_jobs.update_one({"job_id": job_id}, {"$set": {"status": "running", "started_at": datetime.now(timezone.utc)}})
+    try:
+        result = await asyncio.wait_for(match_user_with_lease(uid, incremental=False, wait=True), timeout=MATCHING_JOB_TIMEOUT)
+        status, error = ("done", None) if result and result["status"] == "ok" else ("failed", (result or {}).get("error", "Busy"))
+    except asyncio.TimeoutError:
+        result, status, error = None, "failed", f"Did not finish within {MATCHING_JOB_TIMEOUT}s"
+    await db.matching_jobs.update_one(
+        {"job_id": job_id},
+        {"$set": {"status": status, "error": error, "completed_at": datetime.now(timezone.utc),
+                  "result": {k: v for k, v in (result or {}).items() if k != "status"}}},
+    )
 
-    query = {}
-    title_keywords = prefs.get("desired_titles", [])
-    if title_keywords:
-        regex_pattern = "|".join([re.escape(t) for t in title_keywords])
-        query["title"] = {"$regex": regex_pattern, "$options": "i"}
-    if prefs.get("remote_only"):
-        query["is_remote"] = True
+async def unmatched_posting_ids(uid, posting_ids):
+    """posting_ids (in order) the user has no match for. One probe of the (user_id, job_posting_id) index,
+    so the cost follows the candidates examined rather than the user's whole match history."""
+    matched = {m["job_posting_id"] async for m in db.match_results.find(
+        {"user_id": uid, "job_posting_id": {"$in": posting_ids}}, {"_id": 0, "job_posting_id": 1})}
+    return [pid for pid in posting_ids if pid not in matched]
 
-    jobs = await db.job_postings.find(query, {"_id": 0}).sort("indexed_at", -1).limit(30).to_list(30)
-    jobs = [j for j in jobs if j.get("posting_id") not in already_matched_ids]
+async def match_user(uid, since=None):
+    """Scores the top new candidates for one user; `since` limits candidates to postings first seen after it."""
+    prefs = await db.user_preferences.find_one({"user_id": uid}, {"_id": 0})
+    profile = await db.candidate_profiles.find_one({"user_id": uid}, {"_id": 0})
+    if not prefs or not prefs.get("desired_titles"):
+        return {"matches_created": 0, "message": "No job preferences set."}
+
+    # Only the BM25 top-K reach the LLM; before the search index exists, fall back to the newest title matches
+    jobs = await retrieve_candidates(prefs, profile, uid, MATCHING_MAX_JOBS, since)
+    if jobs is None:
+        query = {"duplicate_of": None, **(title_search_query(prefs.get("desired_titles", [])) or {})}
+        if prefs.get("remote_only"):
+            query["is_remote"] = True
+        if since:
+            query["first_seen_at"] = {"$gt": since}
+
+        candidate_limit = max(30, MATCHING_MAX_JOBS * 2)
+        cursor = db.job_postings.find(query, JOB_PROJECTION).sort("indexed_at", -1)
+        jobs, scanned = [], 0
+        while len(jobs) < candidate_limit and scanned < MATCHING_FALLBACK_SCAN_LIMIT:
+            page = await cursor.to_list(candidate_limit)
+            if not page:
+                break
+            scanned += len(page)
+            fresh = set(await unmatched_posting_ids(uid, [j["posting_id"] for j in page]))
+            jobs.extend(j for j in page if j["posting_id"] in fresh)
+        jobs = jobs[:candidate_limit]
+        # Cheap first-stage rank by the preference scorer; the stable sort keeps newest-first among ties
+        order = np.argsort(-fallback_score_arrays(prefs, profile, jobs)[0], kind="stable") if jobs else []
+        jobs = [jobs[i] for i in order[:MATCHING_MAX_JOBS]]
     if not jobs:
         return {"matches_created": 0, "message": "No new jobs to match."}
-
-    new_matches = []
-    for job in jobs[:5]:
-        try:
-            score_data = await score_match_with_llm(prefs, profile, job)
-        except Exception as e:
-            print(f"LLM scoring error: {e}")
-            score_data = fallback_score(prefs, profile, job)
+    if profile:
+        profile["context"] = await candidate_context(uid, profile)
+
+    # Run time is roughly one LLM round trip per LLM_MAX_CONCURRENCY batches, not one per job
+    batches = [jobs[i:i + MATCHING_BATCH_SIZE] for i in range(0, len(jobs), MATCHING_BATCH_SIZE)]
+    scores = [score for batch in await asyncio.gather(*(score_batch(prefs, profile, b) for b in batches)) for score in batch]
+    now = datetime.now(timezone.utc)
+    ops, candidates = [], []
+    for job, score_data in zip(jobs, scores):
         match_id = f"match_{uuid.uuid4().hex[:12]}"
-        await db.match_results.update_one(
+        # Insert-only: an existing match keeps its id, status and history even if a concurrent run scored it too
+        ops.append(UpdateOne(
             {"user_id": uid, "job_posting_id": job["posting_id"]},
-            {"$set": {"match_id": match_id, "user_id": uid, "job_posting_id": job["posting_id"],
-                      "score": score_data.get("score", 50), "reason_summary": score_data.get("reason_summary", ""),
-                      "reasons": score_data.get("reasons", []), "status": "pending", "created_at": datetime.now(timezone.utc)}},
+            {"$setOnInsert": {"match_id": match_id, "user_id": uid, "job_posting_id": job["posting_id"],
+                              "score": score_data.get("score", 50), "reason_summary": score_data.get("reason_summary", ""),
+                              "reasons": score_data.get("reasons", []), "status": "pending", "created_at": now}},
             upsert=True,
-        )
-        new_matches.append({**score_data, "match_id": match_id, "job_posting_id": job["posting_id"], "job": job})
+        ))
+        candidates.append({**score_data, "match_id": match_id, "user_id": uid, "job_posting_id": job["posting_id"], "job": job})
+    try:
+        inserted = set((await db.match_results.bulk_write(ops, ordered=False)).upserted_ids)
+    except BulkWriteError as e:
+        # Two runs upserting the same new match race on the unique index; the loser's write fails here
+        inserted = {u["index"] for u in e.details.get("upserted", [])}
+    new_matches = [m for i, m in enumerate(candidates) if i in inserted]
 
-    # Auto-notify high-score matches
-    asyncio.create_task(notify_high_score_matches(uid, new_matches))
+    # Auto-notify high-score matches through the outbox
+    await notify_high_score_matches(uid, new_matches)
+    await enqueue_prepared_cover_letters(new_matches)
 
     return {"matches_created": len(new_matches)}
 
+# ── Background Matching ─────────────────────────────────
+# After each ingestion cycle that brought in new postings, every user with preferences is matched against
+# postings first seen since their watermark in matching_state. A per-user lease there keeps background
+# runs and user-triggered runs (across processes) from scoring the same user at the same time.
+MATCHING_USER_CONCURRENCY = int(os.environ.get("MATCHING_USER_CONCURRENCY", "4"))
+MATCHING_LEASE_SECONDS = float(os.environ.get("MATCHING_LEASE_SECONDS", "600"))
+MATCHING_JOB_TIMEOUT = float(os.environ.get("MATCHING_JOB_TIMEOUT", "300"))
+# Postings written by an ingest that overlapped the previous run are reconsidered rather than missed
+MATCHING_WATERMARK_OVERLAP_SECONDS = 120
+
+async def acquire_matching_lease(uid):
+    now = datetime.now(timezone.utc)
+    await db.matching_state.update_one({"user_id": uid}, {"$setOnInsert": {"user_id": uid}}, upsert=True)
+    return await db.matching_state.find_one_and_update(
+        {"user_id": uid, "$or": [{"lease_expires_at": None}, {"lease_expires_at": {"$lt": now}}]},
+        {"$set": {"lease_owner": INSTANCE_ID, "lease_expires_at": now + timedelta(seconds=MATCHING_LEASE_SECONDS)}},
+        projection={"_id": 0}, return_document=ReturnDocument.BEFORE,
+    )
 
-async def score_match_with_llm(prefs, profile, job):
-    if not EMERGENT_LLM_KEY:
-        return fallback_score(prefs, profile, job)
+async def match_user_with_lease(uid, incremental, wait=False):
+    state = await acquire_matching_lease(uid)
+    while state is None and wait:
+        await asyncio.sleep(2)
+        state = await acquire_matching_lease(uid)
+    if state is None:
+        return None
+    started_at = datetime.now(timezone.utc)
+    result = {"status": "failed", "matches_created": 0}
+    try:
+        result = {"status": "ok", **await match_user(uid, state.get("watermark") if incremental else None)}
+    except Exception as e:
+        print(f"Matching error for {uid}: {e}")
+        result["error"] = str(e)
+    finally:
+        update = {"lease_owner": None, "lease_expires_at": None, "last_run_at": started_at,
+                  "last_status": result["status"], "last_matches_created": result["matches_created"]}
+        if result["status"] == "ok":
+            update["watermark"] = started_at - timedelta(seconds=MATCHING_WATERMARK_OVERLAP_SECONDS)
+        await db.matching_state.update_one({"user_id": uid, "lease_owner": INSTANCE_ID}, {"$set": update})
+    return result
+
+async def run_background_matching():
+    semaphore = asyncio.Semaphore(MATCHING_USER_CONCURRENCY)
+
+    async def run(uid):
+        async with semaphore:
+            return await match_user_with_lease(uid, incremental=True)
+
+    try:
+        uids = [p["user_id"] async for p in db.user_preferences.find({"desired_titles.0": {"$exists": True}}, {"_id": 0, "user_id": 1})]
+        results = [r for r in await asyncio.gather(*(run(uid) for uid in uids)) if r]
+        created = sum(r["matches_created"] for r in results)
+        if created:
+            print(f"Background matching: {created} new matches for {len(results)} users")
+    except Exception as e:
+        print(f"Background matching error: {e}")
 
+matching_task = None
+
+def schedule_background_matching(ingest_result):
+    """Starts a matching pass when ingestion inserted postings, unless the previous pass is still running."""
+    global matching_task
+    if not sum(r.get("inserted", 0) for r in ingest_result["sources"]):
+        return
+    if matching_task is None or matching_task.done():
+        matching_task = asyncio.create_task(run_background_matching())
+
+
+# ── Candidate Context ────────────────────────────────────
+# Prompts carry a compact digest of the profile (skills, past titles, seniority, highlights) instead of a raw
+# resume slice. It is built once per profile_version, which upload_resume, delete_resume and profile edits to
+# CANDIDATE_CONTEXT_FIELDS bump, and is kept in candidate_contexts. The model writes it when available; otherwise a keyword
+# heuristic stands in and is rebuilt by the model later.
+CANDIDATE_CONTEXT_FIELDS = ("summary", "years_experience", "resume_text")  # the profile fields the digest is built from
+CANDIDATE_CONTEXT_RESUME_CHARS = 8000
+CANDIDATE_CONTEXT_RETRY_SECONDS = 3600  # how long a heuristic digest is used before asking the model again
+CANDIDATE_CONTEXT_LIMITS = {"skills": 15, "titles": 5, "highlights": 4}
+SENIORITY_LEVELS = ("junior", "mid", "senior", "lead", "executive")
+TITLE_WORDS = frozenset("engineer developer manager designer scientist analyst architect consultant director lead "
+                        "administrator specialist researcher product devops sre".split())
+candidate_context_lru = LruCache(1024)
+
+async def invalidate_candidate_context(uid):
+    await db.candidate_profiles.update_one({"user_id": uid}, {"$inc": {"profile_version": 1}})
+    await db.candidate_contexts.delete_one({"user_id": uid})
+
+async def get_candidate_profile(uid, projection=PROFILE_PROJECTION):
+    """The stored profile with its context digest under "context", for building prompts."""
+    profile = await db.candidate_profiles.find_one({"user_id": uid}, projection)
+    if profile:
+        profile["context"] = await candidate_context(uid, profile)
+    return profile
+
+async def stored_candidate_context(uid, profile):
+    """The digest already built for the profile's current version, or None; never calls the model."""
+    version = profile.get("profile_version", 0)
+    if (cached := candidate_context_lru.get((uid, version))) is not None:
+        return cached
+    doc = await db.candidate_contexts.find_one({"user_id": uid, "profile_version": version}, {"_id": 0, "context": 1})
+    return doc["context"] if doc else None
+
+async def candidate_context(uid, profile):
+    version = profile.get("profile_version", 0)
+    if (cached := candidate_context_lru.get((uid, version))) is not None:
+        return cached
+    doc = await db.candidate_contexts.find_one({"user_id": uid, "profile_version": version}, {"_id": 0})
+    stale = doc and doc.get("source") == "heuristic" and EMERGENT_LLM_KEY and \
+        doc["built_at"].replace(tzinfo=timezone.utc) < datetime.now(timezone.utc) - timedelta(seconds=CANDIDATE_CONTEXT_RETRY_SECONDS)
+    if doc and not stale:
+        context = doc["context"]
+    else:
+        context, source = await build_candidate_context(profile)
+        await db.candidate_contexts.update_one(
+            {"user_id": uid},
+            {"$set": {"user_id": uid, "profile_version": version, "context": context, "source": source, "built_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        if source == "heuristic":
+            # Kept out of the process cache so the model is asked again once the retry window passes
+            return context
+    candidate_context_lru.set((uid, version), context, CANDIDATE_CONTEXT_RETRY_SECONDS)
+    return context
+
+def clean_candidate_context(raw, years_experience=None):
+    context = {}
+    for field, limit in CANDIDATE_CONTEXT_LIMITS.items():
+        values = raw.get(field) if isinstance(raw, dict) else None
+        context[field] = [str(v).strip()[:160] for v in values if str(v).strip()][:limit] if isinstance(values, list) else []
+    seniority = str(raw.get("seniority") or "").lower() if isinstance(raw, dict) else ""
+    context["seniority"] = seniority if seniority in SENIORITY_LEVELS else seniority_from_years(years_experience)
+    return context
+
+def seniority_from_years(years):
+    if not isinstance(years, (int, float)):
+        return ""
+    return "junior" if years < 2 else "mid" if years < 5 else "senior" if years < 10 else "lead"
+
+def heuristic_candidate_context(profile):
+    text = f"{profile.get('summary') or ''}\n{(profile.get('resume_text') or '')[:CANDIDATE_CONTEXT_RESUME_CHARS]}"
+    counts = {}
+    for term in search_tokens(text):
+        if len(term) > 2 and not term.isdigit():
+            counts[term] = counts.get(term, 0) + 1
+    lines = [line.strip(" -•*\t") for line in text.splitlines()]
+    return clean_candidate_context({
+        "skills": sorted(counts, key=lambda t: -counts[t]),
+        "titles": [line for line in lines if len(line) < 60 and TITLE_WORDS & set(search_tokens(line))],
+        # Quantified lines are the closest thing to achievements a keyword pass can find
+        "highlights": [line for line in lines if 30 < len(line) and re.search(r"\d", line)],
+    }, profile.get("years_experience"))
+
+async def build_candidate_context(profile):
+    """Returns (context, source); source is "llm" or "heuristic"."""
+    resume = (profile.get("resume_text") or "")[:CANDIDATE_CONTEXT_RESUME_CHARS]
+    if not resume and not profile.get("summary"):
+        return clean_candidate_context({}, profile.get("years_experience")), "llm"
+    prompt = f"""Summarize this candidate for job matching. Return ONLY valid JSON.
+
+Years of experience: {profile.get('years_experience') or 'unknown'}
+Summary: {profile.get('summary') or ''}
+Resume:
+{resume}
+
+Return JSON: {{"skills": ["<up to 15 concrete skills/technologies>"], "titles": ["<up to 5 recent job titles>"], "seniority": "<one of {', '.join(SENIORITY_LEVELS)}>", "highlights": ["<up to 4 one-line achievements>"]}}"""
+    try:
+        raw = parse_llm_json(await llm_complete(
+            "candidate_context", "You extract concise, factual candidate profiles from resumes. Return ONLY valid JSON.", prompt))
+        return clean_candidate_context(raw, profile.get("years_experience")), "llm"
+    except Exception as e:
+        print(f"Candidate context LLM error: {e}")
+        return heuristic_candidate_context(profile), "heuristic"
+
+def context_prompt_lines(context):
+    lines = []
+    if context.get("seniority"):
+        lines.append(f"Seniority: {context['seniority']}")
+    if context.get("titles"):
+        lines.append(f"Past Titles: {', '.join(context['titles'])}")
+    if context.get("skills"):
+        lines.append(f"Skills: {', '.join(context['skills'])}")
+    if context.get("highlights"):
+        lines.append("Highlights:\n" + "\n".join(f"- {h}" for h in context["highlights"]))
+    return lines
+
+
+def candidate_prompt_lines(prefs, profile):
     candidate_info = []
     if prefs:
         candidate_info.append(f"Desired Titles: {', '.join(prefs.get('desired_titles', []))}")
@@ -725,10 +1834,14 @@ async def score_match_with_llm(prefs, profile, job):
             candidate_info.append(f"Summary: {profile['summary']}")
         if profile.get("years_experience"):
             candidate_info.append(f"Experience: {profile['years_experience']} years")
-        if profile.get("resume_text"):
+        if profile.get("context"):
+            candidate_info.extend(context_prompt_lines(profile["context"]))
+        elif profile.get("resume_text"):
             resume_excerpt = profile["resume_text"][:2000]
             candidate_info.append(f"Resume:\n{resume_excerpt}")
+    return candidate_info
 
+def job_prompt_lines(job):
     job_info = [f"Title: {job.get('title', '')}", f"Company: {job.get('company_name', '')}",
                 f"Location: {job.get('location_text', 'Not specified')}", f"Remote: {job.get('is_remote', False)}",
                 f"Type: {job.get('employment_type', 'Not specified')}"]
@@ -737,56 +1850,176 @@ async def score_match_with_llm(prefs, profile, job):
     desc = (job.get("description", "") or "")[:1500]
     if desc:
         job_info.append(f"Description: {desc}")
+    return job_info
+
+def parse_llm_json(response):
+    text = response.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else text[3:]
+        text = text.rsplit("```", 1)[0]
+    return json.loads(text)
 
+async def llm_score_single(prefs, profile, job):
     prompt = f"""Score how well this candidate matches the job posting. Return ONLY valid JSON.
 
 Candidate:
-{chr(10).join(candidate_info)}
+{chr(10).join(candidate_prompt_lines(prefs, profile))}
 
 Job Posting:
-{chr(10).join(job_info)}
+{chr(10).join(job_prompt_lines(job))}
 
 Return JSON: {{"score": <0-100>, "reason_summary": "<one sentence>", "reasons": [{{"label": "<category>", "detail": "<explanation>"}}]}}"""
 
+    response = await llm_complete(
+        "match_score", "You are a job matching AI. Return ONLY valid JSON with score (0-100), reason_summary, and reasons array.", prompt)
+    scored = batch_score_entry(parse_llm_json(response))
+    return {job["posting_id"]: scored} if scored else {}
+
+async def llm_score_batch(prefs, profile, jobs):
+    postings = "\n\n".join(f"posting_id: {job['posting_id']}\n" + "\n".join(job_prompt_lines(job)) for job in jobs)
+    prompt = f"""Score how well this candidate matches each of the {len(jobs)} job postings below. Return ONLY valid JSON.
+
+Candidate:
+{chr(10).join(candidate_prompt_lines(prefs, profile))}
+
+Job Postings:
+{postings}
+
+Return a JSON array with one object per posting: [{{"posting_id": "<posting_id>", "score": <0-100>, "reason_summary": "<one sentence>", "reasons": [{{"label": "<category>", "detail": "<explanation>"}}]}}]"""
+
+    entries = parse_llm_json(await llm_complete(
+        "match_score", "You are a job matching AI. Return ONLY a valid JSON array with posting_id, score (0-100), reason_summary, and reasons for every posting.",
+        prompt))
+    by_id = {}
+    for entry in entries if isinstance(entries, list) else []:
+        scored = batch_score_entry(entry)
+        if scored:
+            by_id.setdefault(str(entry.get("posting_id")), scored)
+    return by_id
+
+def batch_score_entry(entry):
+    """Validates one element of a batch scoring response; returns None when it is unusable."""
+    if not isinstance(entry, dict) or isinstance(entry.get("score"), bool):
+        return None
     try:
-        chat = LlmChat(api_key=EMERGENT_LLM_KEY, session_id=f"matching_{uuid.uuid4().hex[:8]}",
-                        system_message="You are a job matching AI. Return ONLY valid JSON with score (0-100), reason_summary, and reasons array.")
-        chat.with_model("openai", "gpt-5.2")
-        response = await chat.send_message(UserMessage(text=prompt))
-        text = response.strip()
-        if text.startswith("```"):
-            text = text.split("\n", 1)[1] if "\n" in text else text[3:]
-            text = text.rsplit("```", 1)[0]
-        return json.loads(text)
-    except Exception as e:
-        print(f"LLM error: {e}")
-        return fallback_score(prefs, profile, job)
+        score = int(round(float(entry.get("score"))))
+    except (TypeError, ValueError, OverflowError):
+        return None
+    # A score outside the requested scale means the model misread the task; the heuristic is safer than a clamp
+    if not 0 <= score <= 100:
+        return None
+    reasons = entry.get("reasons")
+    reasons = [r for r in reasons if isinstance(r, dict)] if isinstance(reasons, list) else []
+    return {"score": score, "reason_summary": str(entry.get("reason_summary") or ""), "reasons": reasons}
+
+def match_score_cache_key(prefs, profile, job):
+    # Hashes exactly what the prompt sees, so identical preferences share entries across users
+    return llm_cache_key("match_score", LLM_MODEL, candidate_prompt_lines(prefs, profile), job_prompt_lines(job))
+
+async def score_matches_with_llm(prefs, profile, jobs):
+    """Scores several postings, sending cache misses in one prompt that carries the candidate block once.
+    Returns one score dict per job, in order; anything the model gets wrong falls back per item."""
+    if not EMERGENT_LLM_KEY:
+        LLM_FALLBACKS.inc(len(jobs), purpose="match_score")
+        return fallback_score_batch(prefs, profile, jobs)
+    keys = {job["posting_id"]: match_score_cache_key(prefs, profile, job) for job in jobs}
+    cached = await llm_cache_get_many("match_score", list(keys.values()))
+    scores = {pid: cached[key] for pid, key in keys.items() if key in cached}
+    misses = [job for job in jobs if job["posting_id"] not in scores]
+    if misses:
+        try:
+            fresh = await (llm_score_single(prefs, profile, misses[0]) if len(misses) == 1 else llm_score_batch(prefs, profile, misses))
+        except Exception as e:
+            print(f"LLM error: {e}")
+            fresh = {}
+        for job in misses:
+            if job["posting_id"] in fresh:
+                scores[job["posting_id"]] = fresh[job["posting_id"]]
+                await llm_cache_set("match_score", keys[job["posting_id"]], fresh[job["posting_id"]])
+    unscored = [job for job in jobs if job["posting_id"] not in scores]
+    if unscored:
+        LLM_FALLBACKS.inc(len(unscored), purpose="match_score")
+    fallbacks = iter(fallback_score_batch(prefs, profile, unscored))
+    return [scores[job["posting_id"]] if job["posting_id"] in scores else next(fallbacks) for job in jobs]
 
+async def score_match_with_llm(prefs, profile, job):
+    return (await score_matches_with_llm(prefs, profile, [job]))[0]
+
+
+# Points for the preference heuristic; fallback_score and fallback_score_arrays must stay in step
+FALLBACK_BASE_SCORE = 50
+FALLBACK_TITLE_POINTS = 20
+FALLBACK_REMOTE_POINTS = 10
+FALLBACK_LOCATION_POINTS = 10
+FALLBACK_RESUME_POINTS = 5
+FALLBACK_MAX_SCORE = 100
 
 def fallback_score(prefs, profile, job):
-    score = 50
+    score = FALLBACK_BASE_SCORE
     reasons = []
     if prefs and prefs.get("desired_titles"):
         title_lower = job.get("title", "").lower()
         for dt in prefs["desired_titles"]:
             if dt.lower() in title_lower:
-                score += 20
+                score += FALLBACK_TITLE_POINTS
                 reasons.append({"label": "Title Match", "detail": f"Job title matches '{dt}'"})
                 break
     if prefs and prefs.get("remote_only") and job.get("is_remote"):
-        score += 10
+        score += FALLBACK_REMOTE_POINTS
         reasons.append({"label": "Remote", "detail": "Job is remote as preferred"})
     if prefs and prefs.get("preferred_locations"):
         loc = job.get("location_text", "").lower()
         for pl in prefs["preferred_locations"]:
             if pl.lower() in loc:
-                score += 10
+                score += FALLBACK_LOCATION_POINTS
                 reasons.append({"label": "Location Match", "detail": f"Location matches '{pl}'"})
                 break
     if profile and profile.get("resume_text"):
-        score += 5
+        score += FALLBACK_RESUME_POINTS
         reasons.append({"label": "Resume", "detail": "Resume data available for matching"})
-    return {"score": min(score, 100), "reason_summary": "Scored based on preference matching", "reasons": reasons or [{"label": "General", "detail": "Basic keyword matching applied"}]}
+    return {"score": min(score, FALLBACK_MAX_SCORE), "reason_summary": "Scored based on preference matching", "reasons": reasons or [{"label": "General", "detail": "Basic keyword matching applied"}]}
+
+def first_substring_match(haystacks, needles):
+    """Index of the first needle contained in each haystack, or -1; one boolean (needles x postings) matrix."""
+    if not needles or not len(haystacks):
+        return np.full(len(haystacks), -1)
+    hits = np.stack([np.char.find(haystacks, needle.lower()) >= 0 for needle in needles])
+    return np.where(hits.any(axis=0), hits.argmax(axis=0), -1)
+
+def fallback_score_arrays(prefs, profile, jobs):
+    """Vectorized core of fallback_score: (scores, title match index, remote flags, location match index)."""
+    prefs = prefs or {}
+    titles = np.array([(job.get("title") or "").lower() for job in jobs], dtype=str)
+    locations = np.array([(job.get("location_text") or "").lower() for job in jobs], dtype=str)
+    title_idx = first_substring_match(titles, prefs.get("desired_titles") or [])
+    location_idx = first_substring_match(locations, prefs.get("preferred_locations") or [])
+    remote = np.array([bool(job.get("is_remote")) for job in jobs], dtype=bool) & bool(prefs.get("remote_only"))
+    has_resume = bool(profile and profile.get("resume_text"))
+    scores = (FALLBACK_BASE_SCORE + FALLBACK_TITLE_POINTS * (title_idx >= 0) + FALLBACK_REMOTE_POINTS * remote
+              + FALLBACK_LOCATION_POINTS * (location_idx >= 0) + FALLBACK_RESUME_POINTS * has_resume)
+    return np.minimum(scores, FALLBACK_MAX_SCORE), title_idx, remote, location_idx
+
+def fallback_score_batch(prefs, profile, jobs):
+    """Same results as [fallback_score(prefs, profile, job) for job in jobs], computed for all postings at once."""
+    if not jobs:
+        return []
+    scores, title_idx, remote, location_idx = fallback_score_arrays(prefs, profile, jobs)
+    desired, locations = (prefs or {}).get("desired_titles") or [], (prefs or {}).get("preferred_locations") or []
+    has_resume = bool(profile and profile.get("resume_text"))
+    results = []
+    for i in range(len(jobs)):
+        reasons = []
+        if title_idx[i] >= 0:
+            reasons.append({"label": "Title Match", "detail": f"Job title matches '{desired[title_idx[i]]}'"})
+        if remote[i]:
+            reasons.append({"label": "Remote", "detail": "Job is remote as preferred"})
+        if location_idx[i] >= 0:
+            reasons.append({"label": "Location Match", "detail": f"Location matches '{locations[location_idx[i]]}'"})
+        if has_resume:
+            reasons.append({"label": "Resume", "detail": "Resume data available for matching"})
+        results.append({"score": int(scores[i]), "reason_summary": "Scored based on preference matching",
+                        "reasons": reasons or [{"label": "General", "detail": "Basic keyword matching applied"}]})
+    return results
 
 
 # ── Job Ingestion (6 Sources) ────────────────────────────
@@ -796,6 +2029,38 @@ HN_ALGOLIA_URL = "https://hn.algolia.com/api/v1/search"
 INDEED_RSS_URL = "https://www.indeed.com/rss"
 LINKEDIN_JOBS_URL = "https://www.linkedin.com/jobs-guest/jobs/api/seeMoreJobPostings/search"
 GITHUB_JOBS_URL = "https://github.com/trending"
+ARBEITNOW_API_URL = "https://www.arbeitnow.com/api/job-board-api"
+WWR_FEED_URLS = [WWR_RSS_URL] + [f"https://weworkremotely.com/categories/{c}.rss" for c in (
+    "remote-full-stack-programming-jobs", "remote-back-end-programming-jobs", "remote-front-end-programming-jobs",
+    "remote-devops-sysadmin-jobs", "remote-design-jobs", "remote-customer-support-jobs",
+    "remote-sales-and-marketing-jobs", "remote-management-and-finance-jobs", "all-other-remote-jobs")]
+REMOTIVE_BATCH_SIZE = 100
+HN_PAGE_SIZE = 100
+INDEED_PAGE_SIZE = 20
+LINKEDIN_PAGE_SIZE = 25
+INGESTION_CONCURRENCY = int(os.environ.get("INGESTION_CONCURRENCY", "6"))
+INGESTION_SOURCE_TIMEOUT = float(os.environ.get("INGESTION_SOURCE_TIMEOUT", "120"))
+LINKEDIN_SEEN_IDS_LIMIT = 2000
+INGESTION_PAGE_BUDGET = int(os.environ.get("INGESTION_PAGE_BUDGET", "10"))
+# Per-source override, e.g. INGESTION_SOURCE_PAGE_BUDGET='{"linkedin": 6}'
+SOURCE_PAGE_BUDGETS = json.loads(os.environ.get("INGESTION_SOURCE_PAGE_BUDGET") or "{}")
+INGESTION_FETCH_CONCURRENCY = int(os.environ.get("INGESTION_FETCH_CONCURRENCY", "8"))
+INGESTION_PAGE_BUFFER = int(os.environ.get("INGESTION_PAGE_BUFFER", "2"))
+INGESTION_TICK_SECONDS = float(os.environ.get("INGESTION_TICK_SECONDS", "15"))
+INGESTION_LEASE_SECONDS = float(os.environ.get("INGESTION_LEASE_SECONDS", str(max(120, INGESTION_SOURCE_TIMEOUT * 3))))
+INGESTION_MAX_BACKOFF_SECONDS = float(os.environ.get("INGESTION_MAX_BACKOFF_SECONDS", "3600"))
+INGESTION_IDLE_BACKOFF_FACTOR = 4  # quiet sources slow down to at most 4x their cadence
+# Base cadence per source in seconds; override with INGESTION_SOURCE_CADENCE='{"hackernews": 3600}'
+SOURCE_CADENCE_SECONDS = {"remotive": 300, "weworkremotely": 300, "hackernews": 1800, "indeed": 600, "linkedin": 900, "github_jobs": 600}
+SOURCE_CADENCE_SECONDS.update(json.loads(os.environ.get("INGESTION_SOURCE_CADENCE") or "{}"))
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+INGESTION_PARSE_POOL = os.environ.get("INGESTION_PARSE_POOL", "thread")  # "thread" or "process"
+INGESTION_PARSE_WORKERS = int(os.environ.get("INGESTION_PARSE_WORKERS", "2"))
+INGESTION_STATS_RUN_WINDOW = 200
+INGESTION_BULK_BATCH_SIZE = int(os.environ.get("INGESTION_BULK_BATCH_SIZE", "500"))
+# Fields that define a posting's content; indexed_at and bookkeeping fields are excluded on purpose.
+JOB_CONTENT_FIELDS = ("source_url", "title", "company_name", "location_text", "is_remote", "employment_type",
+                      "description", "category", "tags", "salary_min", "salary_max")
 
 SCRAPER_HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -803,218 +2068,369 @@ SCRAPER_HEADERS = {
     "Accept-Language": "en-US,en;q=0.9",
 }
 
-async def fetch_remotive_jobs():
-    try:
-        async with httpx.AsyncClient(timeout=30) as hc:
-            resp = await hc.get(REMOTIVE_API_URL, params={"limit": 50})
-            if resp.status_code != 200:
-                return []
-            data = resp.json()
-            results = []
-            for j in data.get("jobs", []):
-                results.append({
-                    "posting_id": f"remotive_{j.get('id', '')}", "source_name": "remotive",
-                    "source_job_id": str(j.get("id", "")), "source_url": j.get("url", ""),
-                    "title": j.get("title", ""), "company_name": j.get("company_name", ""),
-                    "location_text": j.get("candidate_required_location", "Worldwide"), "is_remote": True,
-                    "employment_type": (j.get("job_type") or "").replace("_", "-").lower() or "full-time",
-                    "description": (j.get("description", "") or "")[:5000],
-                    "category": j.get("category", ""), "tags": j.get("tags", []),
-                    "indexed_at": datetime.now(timezone.utc),
-                })
-            return results
-    except Exception as e:
-        print(f"Remotive fetch error: {e}")
-        return []
+# ── Ingestion Metrics ────────────────────────────────────
+# Phase timings are work time summed over a source run; with pages pipelined, fetch and write overlap
+INGESTION_RUNS = Counter("ezjob_ingestion_runs_total", "Source ingestion runs by outcome", ("source", "status"))
+INGESTION_RUN_SECONDS = Histogram("ezjob_ingestion_run_duration_seconds", "Wall time of one source ingestion run", ("source",))
+INGESTION_PHASE_SECONDS = Histogram("ezjob_ingestion_phase_seconds", "Time per phase in one source ingestion run", ("source", "phase"))
+INGESTION_BYTES = Counter("ezjob_ingestion_downloaded_bytes_total", "Response bytes downloaded from job sources", ("source",))
+INGESTION_POSTINGS = Counter("ezjob_ingestion_postings_total", "Postings processed by outcome", ("source", "outcome"))
+INGESTION_PHASES = ("fetch", "parse", "dedup", "index", "write")
 
-async def fetch_weworkremotely_jobs():
-    try:
-        async with httpx.AsyncClient(timeout=30) as hc:
-            resp = await hc.get(WWR_RSS_URL)
-            if resp.status_code != 200:
-                return []
-        feed = feedparser.parse(resp.text)
-        results = []
-        for entry in feed.entries[:50]:
-            link = entry.get("link", "")
-            job_id = hashlib.md5(link.encode()).hexdigest()[:16]
-            title_raw = entry.get("title", "")
-            parts = title_raw.split(":", 1)
-            company = parts[0].strip() if len(parts) > 1 else ""
-            title = parts[1].strip() if len(parts) > 1 else title_raw
-            results.append({
-                "posting_id": f"wwr_{job_id}", "source_name": "weworkremotely",
-                "source_job_id": job_id, "source_url": link, "title": title,
-                "company_name": company, "location_text": "Remote", "is_remote": True,
-                "employment_type": "full-time",
-                "description": (entry.get("summary", "") or "")[:5000],
-                "category": "", "tags": [],
-                "indexed_at": datetime.now(timezone.utc),
-            })
-        return results
-    except Exception as e:
-        print(f"WeWorkRemotely fetch error: {e}")
-        return []
+current_ingestion_run = contextvars.ContextVar("current_ingestion_run", default=None)
 
-async def fetch_hackernews_jobs():
+def record_phase(phase, seconds, nbytes=0):
+    run = current_ingestion_run.get()
+    if run is None:
+        return
+    run[f"{phase}_seconds"] += seconds
+    if phase == "fetch":
+        run["pages"] += 1
+        run["bytes"] += nbytes
+
+# ── Feed Parsing (worker pool) ───────────────────────────
+# Parsers are pure module-level functions over raw response bytes so they can run on a
+# thread or process pool and keep CPU-bound feed/HTML work off the event loop.
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+LINKEDIN_CARD_RE = re.compile(r'<li[^>]*>(.*?)</li>', re.DOTALL)
+LINKEDIN_TITLE_RE = re.compile(r'class="base-search-card__title[^"]*"[^>]*>([^<]+)')
+LINKEDIN_COMPANY_RE = re.compile(r'class="base-search-card__subtitle[^"]*"[^>]*>([^<]+)')
+LINKEDIN_LOCATION_RE = re.compile(r'class="job-search-card__location[^"]*"[^>]*>([^<]+)')
+LINKEDIN_LINK_RE = re.compile(r'href="(https://www\.linkedin\.com/jobs/view/[^"?]+)')
+
+parse_executor = None
+
+def get_parse_executor():
+    global parse_executor
+    if parse_executor is None:
+        if INGESTION_PARSE_POOL == "process":
+            parse_executor = ProcessPoolExecutor(max_workers=INGESTION_PARSE_WORKERS)
+        else:
+            parse_executor = ThreadPoolExecutor(max_workers=INGESTION_PARSE_WORKERS, thread_name_prefix="feed-parse")
+    return parse_executor
+
+async def run_parser(parser, *args):
+    return await asyncio.get_running_loop().run_in_executor(get_parse_executor(), partial(parser, *args))
+
+async def parse_page(parser, *args):
+    started = time.perf_counter()
     try:
-        async with httpx.AsyncClient(timeout=30) as hc:
-            resp = await hc.get(HN_ALGOLIA_URL, params={
-                "query": "Ask HN: Who is hiring?",
-                "tags": "ask_hn",
-                "numericFilters": f"created_at_i>{int((datetime.now(timezone.utc) - timedelta(days=60)).timestamp())}",
-                "hitsPerPage": 3,
-            })
-            if resp.status_code != 200:
-                return []
-            data = resp.json()
-            hits = data.get("hits", [])
-            if not hits:
-                return []
-            story_id = hits[0].get("objectID")
-            if not story_id:
-                return []
-            comments_resp = await hc.get(f"https://hn.algolia.com/api/v1/items/{story_id}")
-            if comments_resp.status_code != 200:
-                return []
-            story = comments_resp.json()
-        results = []
-        children = story.get("children", [])[:100]
-        for comment in children:
-            text = comment.get("text", "")
-            if not text or len(text) < 50:
+        return await run_parser(parser, *args)
+    finally:
+        record_phase("parse", time.perf_counter() - started)
+
+def feed_entry_timestamp(entry):
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    return calendar.timegm(parsed) if parsed else 0
+
+def parse_remotive_payload(body, last_id):
+    data = json.loads(body)
+    results = []
+    for j in data.get("jobs", []):
+        if int(j.get("id") or 0) <= last_id:
+            continue
+        results.append({
+            "posting_id": f"remotive_{j.get('id', '')}", "source_name": "remotive",
+            "source_job_id": str(j.get("id", "")), "source_url": j.get("url", ""),
+            "title": j.get("title", ""), "company_name": j.get("company_name", ""),
+            "location_text": j.get("candidate_required_location", "Worldwide"), "is_remote": True,
+            "employment_type": (j.get("job_type") or "").replace("_", "-").lower() or "full-time",
+            "description": (j.get("description", "") or "")[:5000],
+            "category": j.get("category", ""), "tags": j.get("tags", []),
+            "indexed_at": datetime.now(timezone.utc),
+        })
+    return results, max([last_id] + [int(j.get("id") or 0) for j in data.get("jobs", [])])
+
+def parse_weworkremotely_feed(body, last_published):
+    feed = feedparser.parse(body)
+    newest = last_published
+    results = []
+    for entry in feed.entries:
+        published = feed_entry_timestamp(entry)
+        if published and published <= last_published:
+            continue
+        newest = max(newest, published)
+        link = entry.get("link", "")
+        job_id = hashlib.md5(link.encode()).hexdigest()[:16]
+        title_raw = entry.get("title", "")
+        parts = title_raw.split(":", 1)
+        company = parts[0].strip() if len(parts) > 1 else ""
+        title = parts[1].strip() if len(parts) > 1 else title_raw
+        results.append({
+            "posting_id": f"wwr_{job_id}", "source_name": "weworkremotely",
+            "source_job_id": job_id, "source_url": link, "title": title,
+            "company_name": company, "location_text": "Remote", "is_remote": True,
+            "employment_type": "full-time",
+            "description": (entry.get("summary", "") or "")[:5000],
+            "category": "", "tags": [],
+            "indexed_at": datetime.now(timezone.utc),
+        })
+    return results, newest
+
+def parse_hackernews_thread(body, last_comment_id, limit):
+    story = json.loads(body)
+    children = sorted((c for c in story.get("children", []) if (c.get("id") or 0) > last_comment_id),
+                      key=lambda c: c.get("id") or 0)[:limit]
+    results = []
+    for comment in children:
+        text = comment.get("text", "")
+        if not text or len(text) < 50:
+            continue
+        comment_id = str(comment.get("id", ""))
+        lines = text.replace("<p>", "\n").split("\n")
+        first_line = HTML_TAG_RE.sub('', lines[0]).strip() if lines else ""
+        parts = first_line.split("|")
+        company = parts[0].strip() if parts else "Unknown"
+        title_part = parts[1].strip() if len(parts) > 1 else "Software Engineer"
+        location_part = parts[2].strip() if len(parts) > 2 else "Remote"
+        clean_desc = HTML_TAG_RE.sub(' ', text).strip()[:3000]
+        is_remote = "remote" in clean_desc.lower() or "remote" in location_part.lower()
+        results.append({
+            "posting_id": f"hn_{comment_id}", "source_name": "hackernews",
+            "source_job_id": comment_id,
+            "source_url": f"https://news.ycombinator.com/item?id={comment_id}",
+            "title": title_part[:200], "company_name": company[:200],
+            "location_text": location_part[:200], "is_remote": is_remote,
+            "employment_type": "full-time",
+            "description": clean_desc, "category": "tech", "tags": [],
+            "indexed_at": datetime.now(timezone.utc),
+        })
+    return results, max([last_comment_id] + [c.get("id") or 0 for c in children])
+
+def parse_indeed_feed(body, last_published):
+    feed = feedparser.parse(body)
+    newest = last_published
+    results = []
+    for entry in feed.entries:
+        published = feed_entry_timestamp(entry)
+        if published and published <= last_published:
+            continue
+        newest = max(newest, published)
+        link = entry.get("link", "")
+        job_id = hashlib.md5(link.encode()).hexdigest()[:16]
+        title = entry.get("title", "")
+        # feedparser exposes <source> as a dict whose title is the hiring company
+        source = entry.get("source") or {}
+        company = (source.get("title") if isinstance(source, dict) else str(source)) or ""
+        desc = entry.get("summary", "") or entry.get("description", "") or ""
+        results.append({
+            "posting_id": f"indeed_{job_id}", "source_name": "indeed",
+            "source_job_id": job_id, "source_url": link,
+            "title": title, "company_name": company,
+            "location_text": "Remote", "is_remote": True,
+            "employment_type": "full-time",
+            "description": desc[:5000], "category": "", "tags": [],
+            "indexed_at": datetime.now(timezone.utc),
+        })
+    return results, newest
+
+def parse_linkedin_cards(body, seen_ids):
+    html = body.decode("utf-8", errors="replace")
+    seen_ids = list(seen_ids)
+    seen = set(seen_ids)
+    results = []
+    for card in LINKEDIN_CARD_RE.findall(html):
+        title_match = LINKEDIN_TITLE_RE.search(card)
+        company_match = LINKEDIN_COMPANY_RE.search(card)
+        location_match = LINKEDIN_LOCATION_RE.search(card)
+        link_match = LINKEDIN_LINK_RE.search(card)
+        if not title_match:
+            continue
+        title = title_match.group(1).strip()
+        company = company_match.group(1).strip() if company_match else ""
+        location = location_match.group(1).strip() if location_match else "Remote"
+        link = link_match.group(1) if link_match else ""
+        job_id = hashlib.md5(f"{title}{company}".encode()).hexdigest()[:16]
+        if job_id in seen:
+            continue
+        seen.add(job_id)
+        seen_ids.append(job_id)
+        results.append({
+            "posting_id": f"linkedin_{job_id}", "source_name": "linkedin",
+            "source_job_id": job_id, "source_url": link,
+            "title": title, "company_name": company,
+            "location_text": location, "is_remote": "remote" in location.lower(),
+            "employment_type": "full-time",
+            "description": f"{title} at {company} - {location}",
+            "category": "", "tags": [],
+            "indexed_at": datetime.now(timezone.utc),
+        })
+    return results, seen_ids
+
+def parse_arbeitnow_payload(body, last_created):
+    data = json.loads(body)
+    results = []
+    for j in data.get("data", []):
+        if int(j.get("created_at") or 0) <= last_created:
+            continue
+        job_id = str(j.get("slug", "")) or hashlib.md5(j.get("title", "").encode()).hexdigest()[:16]
+        is_remote = j.get("remote", False)
+        results.append({
+            "posting_id": f"github_{job_id[:40]}", "source_name": "github_jobs",
+            "source_job_id": job_id[:40], "source_url": j.get("url", ""),
+            "title": j.get("title", ""), "company_name": j.get("company_name", ""),
+            "location_text": j.get("location", ""), "is_remote": is_remote,
+            "employment_type": "full-time",
+            "description": (j.get("description", "") or "")[:5000],
+            "category": "", "tags": j.get("tags", []),
+            "indexed_at": datetime.now(timezone.utc),
+        })
+    newest = max([last_created] + [int(j.get("created_at") or 0) for j in data.get("data", [])])
+    return results, newest, bool((data.get("links") or {}).get("next"))
+
+# ── Source Fetchers ──────────────────────────────────────
+# Each connector is an async generator that yields one batch of postings per upstream page, so writes
+# start as soon as a page lands. Page fetches share FETCH_SEMAPHORE across all sources, and each source
+# stops at its page budget or at its high-water mark, whichever comes first. Fetch and parse errors are
+# not caught here: they end the walk and reach ingest_source, which records the run as failed, backs the
+# source off and keeps its previous cursor.
+FETCH_SEMAPHORE = asyncio.Semaphore(INGESTION_FETCH_CONCURRENCY)
+
+def page_budget(name):
+    return SOURCE_PAGE_BUDGETS.get(name, INGESTION_PAGE_BUDGET)
+
+async def fetch_page(url, params=None, headers=None, state=None):
+    """Fetches one page; with a source state the request is revalidated and new validators are held in the
+    state until save_source_state, so a failed run never turns the unwritten pages into 304s.
+    Returns None for a 304 and raises httpx.HTTPStatusError for any other non-2xx answer."""
+    async with FETCH_SEMAPHORE:
+        started = time.perf_counter()
+        if state is not None:
+            resp, validators = await conditional_get(url, params=params, headers=headers)
+            if validators:
+                state.setdefault("validators", {})[validators["url"]] = validators
+        else:
+            resp = await get_http_client().get(url, params=params, headers=headers)
+        record_phase("fetch", time.perf_counter() - started, len(resp.content) if resp is not None else 0)
+        return resp.raise_for_status() if resp is not None else None
+
+# Newest-first boards (Indeed, Arbeitnow) are walked from the top down to the previous high-water mark. The
+# mark only moves once a walk gets there; a walk cut short by the page budget is saved as a resume point, so
+# the next run continues below the last page read instead of skipping everything under it.
+def resume_walk(cursor, first_page):
+    """(mark, newest seen, page to start at) from a stored cursor; a plain timestamp is a finished walk."""
+    if isinstance(cursor, dict):
+        return cursor["mark"], cursor["newest"], cursor["resume_page"]
+    return cursor or 0, cursor or 0, first_page
+
+def walk_cursor(mark, newest, next_page, finished):
+    return newest if finished else {"mark": mark, "newest": newest, "resume_page": next_page}
+
+async def fetch_remotive_jobs(state):
+    # The Remotive API has no paging; one unbounded request is split into write-sized batches
+    resp = await fetch_page(REMOTIVE_API_URL, state=state)
+    if resp is None:
+        return
+    results, newest = await parse_page(parse_remotive_payload, resp.content, state.get("cursor") or 0)
+    for i in range(0, len(results), REMOTIVE_BATCH_SIZE):
+        yield results[i:i + REMOTIVE_BATCH_SIZE]
+    state["cursor"] = newest
+
+async def fetch_weworkremotely_jobs(state):
+    # Pages are the main feed followed by the category feeds; each feed keeps its own publish-date mark,
+    # keyed by feed name because Mongo field names cannot safely contain dots
+    cursor = state.get("cursor")
+    cursor = dict(cursor) if isinstance(cursor, dict) else {"remote-jobs": cursor or 0}
+    for feed_url in WWR_FEED_URLS[:page_budget("weworkremotely")]:
+        feed_key = feed_url.rsplit("/", 1)[-1].removesuffix(".rss")
+        resp = await fetch_page(feed_url, state=state)
+        if resp is None:
+            continue
+        results, cursor[feed_key] = await parse_page(parse_weworkremotely_feed, resp.content, cursor.get(feed_key, 0))
+        if results:
+            yield results
+    state["cursor"] = cursor
+
+async def fetch_hackernews_jobs(state):
+    # The search window moves on every call, so there is nothing to revalidate
+    resp = await fetch_page(HN_ALGOLIA_URL, params={
+        "query": "Ask HN: Who is hiring?",
+        "tags": "ask_hn",
+        "numericFilters": f"created_at_i>{int((datetime.now(timezone.utc) - timedelta(days=60)).timestamp())}",
+        "hitsPerPage": 3,
+    })
+    hits = resp.json().get("hits", [])
+    story_id = hits[0].get("objectID") if hits else None
+    if not story_id:
+        return
+    comments_resp = await fetch_page(f"https://hn.algolia.com/api/v1/items/{story_id}", state=state)
+    if comments_resp is None:
+        return
+    # Cursor is the newest comment processed in the current thread; a new monthly thread starts over
+    cursor = state.get("cursor") or {}
+    last_comment_id = cursor.get("comment_id", 0) if cursor.get("story_id") == story_id else 0
+    # The whole thread arrives in one response; a "page" is HN_PAGE_SIZE top-level comments
+    results, newest = await parse_page(parse_hackernews_thread, comments_resp.content, last_comment_id,
+                                       HN_PAGE_SIZE * page_budget("hackernews"))
+    for i in range(0, len(results), HN_PAGE_SIZE):
+        yield results[i:i + HN_PAGE_SIZE]
+    state["cursor"] = {"story_id": story_id, "comment_id": newest}
+
+async def fetch_indeed_jobs(state):
+    queries = ["remote developer", "remote software engineer", "remote data scientist"]
+    pages_per_query = max(1, page_budget("indeed") // len(queries))
+    cursor = dict(state.get("cursor") or {})
+    for q in queries:
+        last_published, newest, first_page = resume_walk(cursor.get(q), 0)
+        page, finished = first_page, False
+        for page in range(first_page, first_page + pages_per_query):
+            resp = await fetch_page(INDEED_RSS_URL, params={"q": q, "l": "remote", "sort": "date", "limit": INDEED_PAGE_SIZE,
+                                                            "start": page * INDEED_PAGE_SIZE}, headers=SCRAPER_HEADERS,
+                                    state=state)
+            if resp is None:
+                # An unchanged first page means nothing new; deeper in a resumed walk it only means this page was seen
+                if page == first_page == 0:
+                    finished = True
+                    break
                 continue
-            comment_id = str(comment.get("id", ""))
-            lines = text.replace("<p>", "\n").split("\n")
-            first_line = re.sub(r'<[^>]+>', '', lines[0]).strip() if lines else ""
-            parts = first_line.split("|")
-            company = parts[0].strip() if parts else "Unknown"
-            title_part = parts[1].strip() if len(parts) > 1 else "Software Engineer"
-            location_part = parts[2].strip() if len(parts) > 2 else "Remote"
-            clean_desc = re.sub(r'<[^>]+>', ' ', text).strip()[:3000]
-            is_remote = "remote" in clean_desc.lower() or "remote" in location_part.lower()
-            results.append({
-                "posting_id": f"hn_{comment_id}", "source_name": "hackernews",
-                "source_job_id": comment_id,
-                "source_url": f"https://news.ycombinator.com/item?id={comment_id}",
-                "title": title_part[:200], "company_name": company[:200],
-                "location_text": location_part[:200], "is_remote": is_remote,
-                "employment_type": "full-time",
-                "description": clean_desc, "category": "tech", "tags": [],
-                "indexed_at": datetime.now(timezone.utc),
-            })
-        return results
-    except Exception as e:
-        print(f"HackerNews fetch error: {e}")
-        return []
-
-async def fetch_indeed_jobs():
-    try:
-        queries = ["remote developer", "remote software engineer", "remote data scientist"]
-        all_results = []
-        async with httpx.AsyncClient(timeout=30, headers=SCRAPER_HEADERS) as hc:
-            for q in queries:
-                try:
-                    resp = await hc.get(INDEED_RSS_URL, params={"q": q, "l": "remote", "sort": "date", "limit": 20})
-                    if resp.status_code != 200:
-                        continue
-                    feed = feedparser.parse(resp.text)
-                    for entry in feed.entries[:20]:
-                        link = entry.get("link", "")
-                        job_id = hashlib.md5(link.encode()).hexdigest()[:16]
-                        title = entry.get("title", "")
-                        company = ""
-                        source_text = entry.get("source", "")
-                        if hasattr(source_text, "value"):
-                            company = source_text.value
-                        elif isinstance(source_text, str):
-                            company = source_text
-                        desc = entry.get("summary", "") or entry.get("description", "") or ""
-                        all_results.append({
-                            "posting_id": f"indeed_{job_id}", "source_name": "indeed",
-                            "source_job_id": job_id, "source_url": link,
-                            "title": title, "company_name": company,
-                            "location_text": "Remote", "is_remote": True,
-                            "employment_type": "full-time",
-                            "description": desc[:5000], "category": "", "tags": [],
-                            "indexed_at": datetime.now(timezone.utc),
-                        })
-                except Exception:
-                    continue
-        return all_results
-    except Exception as e:
-        print(f"Indeed fetch error: {e}")
-        return []
-
-async def fetch_linkedin_jobs():
-    try:
-        results = []
-        keywords_list = ["remote software engineer", "remote developer", "remote data"]
-        async with httpx.AsyncClient(timeout=30, headers=SCRAPER_HEADERS, follow_redirects=True) as hc:
-            for keywords in keywords_list:
-                try:
-                    resp = await hc.get(LINKEDIN_JOBS_URL, params={
-                        "keywords": keywords, "location": "Worldwide",
-                        "f_WT": "2", "start": "0", "count": "25",
-                    })
-                    if resp.status_code != 200:
-                        continue
-                    html = resp.text
-                    job_cards = re.findall(r'<li[^>]*>(.*?)</li>', html, re.DOTALL)
-                    for card in job_cards[:25]:
-                        title_match = re.search(r'class="base-search-card__title[^"]*"[^>]*>([^<]+)', card)
-                        company_match = re.search(r'class="base-search-card__subtitle[^"]*"[^>]*>([^<]+)', card)
-                        location_match = re.search(r'class="job-search-card__location[^"]*"[^>]*>([^<]+)', card)
-                        link_match = re.search(r'href="(https://www\.linkedin\.com/jobs/view/[^"?]+)', card)
-                        if not title_match:
-                            continue
-                        title = title_match.group(1).strip()
-                        company = company_match.group(1).strip() if company_match else ""
-                        location = location_match.group(1).strip() if location_match else "Remote"
-                        link = link_match.group(1) if link_match else ""
-                        job_id = hashlib.md5(f"{title}{company}".encode()).hexdigest()[:16]
-                        results.append({
-                            "posting_id": f"linkedin_{job_id}", "source_name": "linkedin",
-                            "source_job_id": job_id, "source_url": link,
-                            "title": title, "company_name": company,
-                            "location_text": location, "is_remote": "remote" in location.lower(),
-                            "employment_type": "full-time",
-                            "description": f"{title} at {company} - {location}",
-                            "category": "", "tags": [],
-                            "indexed_at": datetime.now(timezone.utc),
-                        })
-                except Exception:
-                    continue
-        return results
-    except Exception as e:
-        print(f"LinkedIn fetch error: {e}")
-        return []
-
-async def fetch_github_jobs():
-    try:
-        async with httpx.AsyncClient(timeout=30, headers=SCRAPER_HEADERS, follow_redirects=True) as hc:
-            resp = await hc.get("https://www.arbeitnow.com/api/job-board-api", params={"page": "1"})
-            if resp.status_code != 200:
-                return []
-            data = resp.json()
-        results = []
-        for j in data.get("data", [])[:50]:
-            job_id = str(j.get("slug", "")) or hashlib.md5(j.get("title", "").encode()).hexdigest()[:16]
-            is_remote = j.get("remote", False)
-            results.append({
-                "posting_id": f"github_{job_id[:40]}", "source_name": "github_jobs",
-                "source_job_id": job_id[:40], "source_url": j.get("url", ""),
-                "title": j.get("title", ""), "company_name": j.get("company_name", ""),
-                "location_text": j.get("location", ""), "is_remote": is_remote,
-                "employment_type": "full-time",
-                "description": (j.get("description", "") or "")[:5000],
-                "category": "", "tags": j.get("tags", []),
-                "indexed_at": datetime.now(timezone.utc),
-            })
-        return results
-    except Exception as e:
-        print(f"GitHub Jobs fetch error: {e}")
-        return []
+            results, page_newest = await parse_page(parse_indeed_feed, resp.content, last_published)
+            newest = max(newest, page_newest)
+            # Results are sorted by date, so a page with nothing new means the mark was reached
+            if not results:
+                finished = True
+                break
+            yield results
+        cursor[q] = walk_cursor(last_published, newest, page + 1, finished)
+    state["cursor"] = cursor
+
+async def fetch_linkedin_jobs(state):
+    # Guest search cards carry no stable ordering key, so the cursor is a bounded set of recently seen ids
+    seen_ids = list(state.get("cursor") or [])
+    keywords_list = ["remote software engineer", "remote developer", "remote data"]
+    pages_per_query = max(1, page_budget("linkedin") // len(keywords_list))
+    for keywords in keywords_list:
+        for page in range(pages_per_query):
+            resp = await fetch_page(LINKEDIN_JOBS_URL, params={
+                "keywords": keywords, "location": "Worldwide",
+                "f_WT": "2", "start": str(page * LINKEDIN_PAGE_SIZE), "count": str(LINKEDIN_PAGE_SIZE),
+            }, headers=SCRAPER_HEADERS, state=state)
+            if resp is None:
+                break
+            cards, seen_ids = await parse_page(parse_linkedin_cards, resp.content, seen_ids)
+            if not cards:
+                break
+            yield cards
+    state["cursor"] = seen_ids[-LINKEDIN_SEEN_IDS_LIMIT:]
+
+async def fetch_github_jobs(state):
+    last_created, newest, first_page = resume_walk(state.get("cursor"), 1)
+    page, finished = first_page, False
+    for page in range(first_page, first_page + page_budget("github_jobs")):
+        resp = await fetch_page(ARBEITNOW_API_URL, params={"page": str(page)}, headers=SCRAPER_HEADERS, state=state)
+        if resp is None:
+            if page == first_page == 1:
+                finished = True
+                break
+            continue
+        results, page_newest, has_more = await parse_page(parse_arbeitnow_payload, resp.content, last_created)
+        newest = max(newest, page_newest)
+        if results:
+            yield results
+        # The board is newest-first: an exhausted or fully-seen page ends the walk
+        if not has_more or not results:
+            finished = True
+            break
+    state["cursor"] = walk_cursor(last_created, newest, page + 1, finished)
 
 JOB_SOURCES = [
     ("remotive", fetch_remotive_jobs),
@@ -1025,46 +2441,711 @@ JOB_SOURCES = [
     ("github_jobs", fetch_github_jobs),
 ]
 
-async def ingest_jobs():
-    all_jobs = []
-    sources_results = []
-    for name, fetcher in JOB_SOURCES:
+# ── Near-Duplicate Detection ─────────────────────────────
+# MinHash signatures over title + company + location, bucketed into LSH bands. The bands are stored
+# on each posting with a multikey index, so finding candidates is an index lookup instead of a scan.
+# A near-duplicate must also name the same company, so generic titles at different employers never merge.
+DEDUP_NUM_PERM = 64
+DEDUP_BANDS = 16
+DEDUP_ROWS = DEDUP_NUM_PERM // DEDUP_BANDS
+DEDUP_SIMILARITY_THRESHOLD = float(os.environ.get("DEDUP_SIMILARITY_THRESHOLD", "0.8"))
+DEDUP_MAX_CANDIDATES = 200  # per posting, so recall does not shrink as the batch or the table grows
+DEDUP_QUERY_CONCURRENCY = 16
+MINHASH_PRIME = (1 << 61) - 1
+# Fixed seed: signatures are persisted and must be identical across processes and restarts
+_dedup_rng = random.Random(20260212)
+MINHASH_PERMUTATIONS = [(_dedup_rng.randrange(1, MINHASH_PRIME), _dedup_rng.randrange(0, MINHASH_PRIME)) for _ in range(DEDUP_NUM_PERM)]
+NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+
+def normalize_dedup_field(value):
+    return NON_ALNUM_RE.sub(' ', (value or "").lower()).strip()
+
+def dedup_text(job):
+    return " ".join(normalize_dedup_field(job.get(field)) for field in ("title", "company_name", "location_text")).strip()
+
+def minhash_signature(text):
+    shingles = {text[i:i + 3] for i in range(max(len(text) - 2, 1))}
+    hashes = [int.from_bytes(hashlib.blake2b(sh.encode(), digest_size=8).digest(), "little") for sh in shingles]
+    return [min((a * h + b) % MINHASH_PRIME for h in hashes) & 0xFFFFFFFF for a, b in MINHASH_PERMUTATIONS]
+
+def lsh_bands(signature):
+    return [f"{band}:{hashlib.md5(str(signature[band * DEDUP_ROWS:(band + 1) * DEDUP_ROWS]).encode()).hexdigest()[:12]}"
+            for band in range(DEDUP_BANDS)]
+
+def compute_dedup_signatures(texts):
+    signatures = [minhash_signature(text) for text in texts]
+    return [(sig, lsh_bands(sig)) for sig in signatures]
+
+def signature_similarity(a, b):
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+def best_duplicate(job, candidates):
+    company = normalize_dedup_field(job.get("company_name"))
+    best, best_sim = None, DEDUP_SIMILARITY_THRESHOLD
+    for cand in candidates:
+        if cand["posting_id"] == job["posting_id"] or normalize_dedup_field(cand.get("company_name")) != company:
+            continue
+        sim = signature_similarity(job["dedup_minhash"], cand["dedup_minhash"])
+        if sim >= best_sim:
+            best, best_sim = cand["posting_id"], sim
+    return best
+
+async def link_near_duplicates(jobs):
+    """Attach MinHash/LSH fields to new or changed postings and point near-duplicates at their canonical posting."""
+    if not jobs:
+        return 0
+    for job in jobs:
+        job["dedup_minhash"], job["dedup_bands"], job["duplicate_of"] = [], [], None
+    # Without both a title and a company there is nothing to tell two postings apart, so they are never signed
+    jobs = [job for job in jobs if normalize_dedup_field(job.get("title")) and normalize_dedup_field(job.get("company_name"))]
+    if not jobs:
+        return 0
+    signatures = await run_parser(compute_dedup_signatures, [dedup_text(job) for job in jobs])
+    for job, (sig, bands) in zip(jobs, signatures):
+        job["dedup_minhash"], job["dedup_bands"] = sig, bands
+
+    semaphore = asyncio.Semaphore(DEDUP_QUERY_CONCURRENCY)
+
+    async def stored_candidates(job):
+        async with semaphore:
+            return await db.job_postings.find(
+                {"dedup_bands": {"$in": job["dedup_bands"]}, "duplicate_of": None},
+                {"_id": 0, "posting_id": 1, "company_name": 1, "dedup_minhash": 1},
+            ).limit(DEDUP_MAX_CANDIDATES).to_list(DEDUP_MAX_CANDIDATES)
+
+    stored = await asyncio.gather(*(stored_candidates(job) for job in jobs))
+    # Earlier postings in the batch are canonical for later ones; none of them is stored yet
+    batch_bands = {}
+    duplicates = 0
+    for job, candidates in zip(jobs, stored):
+        in_batch = {cand["posting_id"]: cand for band in job["dedup_bands"] for cand in batch_bands.get(band, [])}
+        job["duplicate_of"] = best_duplicate(job, candidates + list(in_batch.values()))
+        if job["duplicate_of"]:
+            duplicates += 1
+            continue
+        for band in job["dedup_bands"]:
+            batch_bands.setdefault(band, []).append(job)
+    return duplicates
+
+# ── Search Index (BM25) ──────────────────────────────────
+# Each posting stores its term frequencies (search_tf), distinct terms (search_terms, multikey index) and
+# length; document frequencies (search_df) and corpus totals (search_stats) are kept current with $inc
+# as postings are written, so matching can rank with BM25 without scanning the collection.
+BM25_K1 = 1.2
+BM25_B = 0.75
+SEARCH_TITLE_WEIGHT = 3  # title terms count as if repeated this many times
+SEARCH_MAX_TERMS = 200  # highest-frequency distinct terms kept per posting
+SEARCH_STATS_NAME = "job_postings"
+SEARCH_TOKEN_RE = re.compile(r'[a-z0-9][a-z0-9+#]*')
+SEARCH_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the this to we will with you your "
+    "who what when where which their they them us".split())
+
+def search_tokens(text):
+    return [t for t in SEARCH_TOKEN_RE.findall((text or "").lower()) if t not in SEARCH_STOPWORDS]
+
+def hashed_feature_vector(tf):
+    """Signed feature hashing of log-scaled term frequencies into FEATURE_DIM float32 slots, L2-normalized."""
+    vec = np.zeros(FEATURE_DIM, dtype=np.float32)
+    for term, count in tf.items():
+        h = int.from_bytes(hashlib.blake2b(term.encode(), digest_size=8).digest(), "little")
+        vec[h % FEATURE_DIM] += (1.0 if h >> 63 else -1.0) * (1.0 + math.log(count))
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+def compute_search_fields(docs):
+    """docs are (title, body) pairs; returns (term frequencies, length, hashed feature vector bytes) per posting."""
+    results = []
+    for title, body in docs:
+        tf = {}
+        for term in search_tokens(title):
+            tf[term] = tf.get(term, 0) + SEARCH_TITLE_WEIGHT
+        for term in search_tokens(body):
+            tf[term] = tf.get(term, 0) + 1
+        length = sum(tf.values())
+        if len(tf) > SEARCH_MAX_TERMS:
+            tf = dict(sorted(tf.items(), key=lambda kv: -kv[1])[:SEARCH_MAX_TERMS])
+        results.append((tf, length, hashed_feature_vector(tf).tobytes()))
+    return results
+
+def search_document(job):
+    body = f"{job.get('company_name') or ''} {' '.join(job.get('tags') or [])} {job.get('category') or ''} {job.get('description') or ''}"
+    return job.get("title") or "", HTML_TAG_RE.sub(" ", body)
+
+def title_tokens(text):
+    # Light plural folding so "Engineers" and "engineer" meet; applied to postings and queries alike
+    return list(dict.fromkeys(t[:-1] if len(t) > 3 and t.endswith("s") and not t.endswith("ss") else t
+                              for t in search_tokens(text)))
+
+def title_search_query(titles):
+    """Indexed replacement for an unanchored title $regex: any title whose tokens are all present."""
+    clauses = [{"title_tokens": {"$all": tokens}} for tokens in (title_tokens(t) for t in titles) if tokens]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+async def attach_search_fields(jobs):
+    fields = await run_parser(compute_search_fields, [search_document(job) for job in jobs])
+    now = datetime.now(timezone.utc)
+    for job, (tf, length, vec) in zip(jobs, fields):
+        job["search_tf"], job["search_terms"], job["search_len"] = tf, list(tf), length
+        job["title_tokens"] = title_tokens(job.get("title"))
+        job["feature_vec"], job["feature_at"] = vec, now
+
+async def apply_search_deltas(added, removed):
+    """added/removed are lists of (terms, length) for postings that entered or left the index."""
+    df = {}
+    for terms, _ in added:
+        for term in terms:
+            df[term] = df.get(term, 0) + 1
+    for terms, _ in removed:
+        for term in terms:
+            df[term] = df.get(term, 0) - 1
+    ops = [UpdateOne({"term": term}, {"$inc": {"df": delta}}, upsert=True) for term, delta in df.items() if delta]
+    try:
+        if ops:
+            await db.search_df.bulk_write(ops, ordered=False)
+        if added or removed:
+            await db.search_stats.update_one(
+                {"name": SEARCH_STATS_NAME},
+                {"$inc": {"doc_count": len(added) - len(removed),
+                          "total_len": sum(n for _, n in added) - sum(n for _, n in removed)}},
+                upsert=True,
+            )
+    except Exception as e:
+        print(f"Search index update error: {e}")
+
+async def index_unsearchable_postings(jobs):
+    has_bm25 = {job["posting_id"] for job in jobs if job.get("search_len") is not None}
+    await attach_search_fields(jobs)
+    added = []
+    for job in jobs:
+        if job["posting_id"] in has_bm25:
+            await db.job_postings.update_one({"posting_id": job["posting_id"]}, {"$set": {
+                "title_tokens": job["title_tokens"], "feature_vec": job["feature_vec"], "feature_at": job["feature_at"]}})
+            continue
+        # The search_len guard keeps a concurrent backfill or ingest from counting a posting twice
+        res = await db.job_postings.update_one(
+            {"posting_id": job["posting_id"], "search_len": None},
+            {"$set": {"search_tf": job["search_tf"], "search_terms": job["search_terms"], "search_len": job["search_len"],
+                      "title_tokens": job["title_tokens"], "feature_vec": job["feature_vec"], "feature_at": job["feature_at"]}},
+        )
+        if res.modified_count:
+            added.append((job["search_terms"], job["search_len"]))
+    await apply_search_deltas(added, [])
+
+async def backfill_search_index():
+    """Indexes postings written before search fields existed; safe to run from several processes."""
+    try:
+        batch = []
+        async for job in db.job_postings.find({"feature_vec": None}, {"_id": 0, "posting_id": 1, "title": 1, "company_name": 1,
+                                                                       "tags": 1, "category": 1, "description": 1, "search_len": 1}):
+            batch.append(job)
+            if len(batch) >= INGESTION_BULK_BATCH_SIZE:
+                await index_unsearchable_postings(batch)
+                batch = []
+        if batch:
+            await index_unsearchable_postings(batch)
+    except Exception as e:
+        print(f"Search index backfill error: {e}")
+
+def matching_query_weights(prefs, profile):
+    weights = {}
+    for term in search_tokens(" ".join(prefs.get("desired_titles") or [])):
+        weights[term] = weights.get(term, 0) + MATCHING_TITLE_QUERY_WEIGHT
+    if profile:
+        counts = {}
+        for term in search_tokens(f"{profile.get('summary') or ''} {(profile.get('resume_text') or '')[:5000]}"):
+            counts[term] = counts.get(term, 0) + 1
+        for term, _ in sorted(counts.items(), key=lambda kv: -kv[1])[:MATCHING_PROFILE_QUERY_TERMS]:
+            weights[term] = weights.get(term, 0) + 1
+    return weights
+
+async def retrieve_candidates(prefs, profile, uid, limit, since=None):
+    """Top postings the user has not been matched with, ranked by BM25 against the candidate's titles, summary and
+    resume, or None when the index is empty. Each query term reads at most MATCHING_POSTINGS_PER_TERM postings,
+    so cost stays flat as the collection grows."""
+    weights = matching_query_weights(prefs, profile)
+    stats = await db.search_stats.find_one({"name": SEARCH_STATS_NAME}, {"_id": 0})
+    if not weights or not stats or stats.get("doc_count", 0) <= 0:
+        return None
+    n_docs, avg_len = stats["doc_count"], max(stats.get("total_len", 0) / stats["doc_count"], 1.0)
+    df = {doc["term"]: doc["df"] async for doc in db.search_df.find({"term": {"$in": list(weights)}}, {"_id": 0})}
+    idf = {t: math.log(1 + (n_docs - d + 0.5) / (d + 0.5)) for t, d in df.items() if d > 0}
+    terms = sorted(idf, key=lambda t: -weights[t] * idf[t])[:MATCHING_QUERY_TERMS]
+    if not terms:
+        return None
+
+    base = {"duplicate_of": None}
+    if prefs.get("remote_only"):
+        base["is_remote"] = True
+    if since:
+        base["first_seen_at"] = {"$gt": since}
+    projection = {"_id": 0, "posting_id": 1, "search_len": 1, **{f"search_tf.{t}": 1 for t in terms}}
+
+    async def postings_for(term):
+        return await db.job_postings.find({**base, "search_terms": term}, projection).sort("indexed_at", -1).limit(
+            MATCHING_POSTINGS_PER_TERM).to_list(MATCHING_POSTINGS_PER_TERM)
+
+    scores = {}
+    for docs in await asyncio.gather(*(postings_for(t) for t in terms)):
+        for doc in docs:
+            if doc["posting_id"] in scores:
+                continue
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * (doc.get("search_len") or 0) / avg_len)
+            tf = doc.get("search_tf") or {}
+            scores[doc["posting_id"]] = sum(weights[t] * idf[t] * tf[t] * (BM25_K1 + 1) / (tf[t] + norm) for t in terms if t in tf)
+
+    # Blend normalized BM25 with vector similarity; the vector ranker also contributes postings BM25 never saw
+    query_vec = matching_query_vector(prefs, profile)
+    if query_vec is not None:
+        await feature_index.refresh()
+        sims = feature_index.rank(query_vec, FEATURE_CANDIDATES, bool(prefs.get("remote_only")), since, include=scores)
+        top_bm25 = max(scores.values(), default=0) or 1.0
+        scores = {pid: (1 - FEATURE_BLEND_WEIGHT) * scores.get(pid, 0) / top_bm25 + FEATURE_BLEND_WEIGHT * sims.get(pid, 0)
+                  for pid in set(scores) | set(sims)}
+    ranked, top = sorted(scores, key=lambda pid: -scores[pid]), []
+    for i in range(0, len(ranked), limit * 2):
+        top += await unmatched_posting_ids(uid, ranked[i:i + limit * 2])
+        if len(top) >= limit:
+            break
+    top = top[:limit]
+    jobs = await db.job_postings.find({"posting_id": {"$in": top}}, JOB_PROJECTION).to_list(len(top))
+    rank = {pid: i for i, pid in enumerate(top)}
+    for job in jobs:
+        job["retrieval_score"] = round(scores[job["posting_id"]], 3)
+    return sorted(jobs, key=lambda j: rank[j["posting_id"]])
+
+# ── Feature Vectors ──────────────────────────────────────
+# Postings and profiles carry a hashed bag-of-words vector (float32 bytes in feature_vec). Active postings
+# are mirrored in a matrix that refreshes incrementally from feature_at, so one user's similarity against
+# every posting is a single matrix-vector product. The matrix lives in memory-mapped files under
+# FEATURE_INDEX_DIR (tmpfs when available): every API process on the host maps the same pages, and only
+# the process holding the writer lock polls Mongo and writes rows, so RAM does not grow with worker count.
+FEATURE_DIM = int(os.environ.get("FEATURE_DIM", "256"))
+FEATURE_INDEX_REFRESH_SECONDS = float(os.environ.get("FEATURE_INDEX_REFRESH_SECONDS", "30"))
+FEATURE_REFRESH_OVERLAP_SECONDS = 60  # rows written slightly out of feature_at order are still picked up
+FEATURE_CANDIDATES = 200
+FEATURE_BLEND_WEIGHT = float(os.environ.get("FEATURE_BLEND_WEIGHT", "0.3"))
+FEATURE_INDEX_DIR = Path(os.environ.get("FEATURE_INDEX_DIR") or
+                         Path("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()) / f"ezjob-features-{DB_NAME}-{FEATURE_DIM}")
+FEATURE_META_DTYPE = np.dtype([("active", "?"), ("remote", "?"), ("first_seen", "<f8")])
+
+def as_utc_timestamp(value):
+    return value.replace(tzinfo=timezone.utc).timestamp() if value else 0.0
+
+class FeatureIndex:
+    """Rows are appended to vectors-<capacity>.f32 and meta-<capacity>.bin before their posting id is appended to
+    ids.txt, so a reader that sees an id also sees its row. state.json names the current capacity and the Mongo
+    watermark; growing copies into files of twice the capacity and switches state.json to them."""
+    def __init__(self, directory=FEATURE_INDEX_DIR):
+        self.directory = Path(directory)
+        self.capacity = 0
+        self.matrix = np.zeros((0, FEATURE_DIM), dtype=np.float32)
+        self.meta = np.zeros(0, dtype=FEATURE_META_DTYPE)
+        self.ids = []
+        self.rows = {}
+        self.ids_offset = 0
+        self.writer_lock = None  # open lock file while this process is the writer
+        self.refreshed_at = 0.0
+        self.lock = asyncio.Lock()
+
+    def _path(self, name):
+        return self.directory / name
+
+    def _read_state(self):
+        try:
+            return json.loads(self._path("state.json").read_text())
+        except (FileNotFoundError, ValueError):
+            return {"capacity": 0, "watermark": None}
+
+    def _write_state(self, state):
+        tmp = self._path(f"state.json.{INSTANCE_ID}")
+        tmp.write_text(json.dumps(state))
+        os.replace(tmp, self._path("state.json"))
+
+    def _map(self, capacity):
+        mode = "r+" if self.writer_lock else "r"
+        if capacity:
+            self.matrix = np.memmap(self._path(f"vectors-{capacity}.f32"), dtype=np.float32, mode=mode, shape=(capacity, FEATURE_DIM))
+            self.meta = np.memmap(self._path(f"meta-{capacity}.bin"), dtype=FEATURE_META_DTYPE, mode=mode, shape=(capacity,))
+        self.capacity = capacity
+
+    def _acquire_writer(self):
+        if self.writer_lock:
+            return True
+        lock_file = open(self._path("writer.lock"), "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        self.writer_lock = lock_file
+        self._map(self.capacity)  # remap writable
+        return True
+
+    def _follow(self):
+        """Picks up the current files and any posting ids the writer appended since the last call."""
+        capacity = self._read_state()["capacity"]
+        if capacity != self.capacity:
+            self._map(capacity)
+        try:
+            with open(self._path("ids.txt"), "rb") as f:
+                f.seek(self.ids_offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return
+        # Only whole lines whose rows fit the mapped files; the rest is read on a later call
+        for line in chunk[:chunk.rfind(b"\n") + 1].splitlines(keepends=True):
+            if len(self.ids) >= self.capacity:
+                break
+            pid = line.decode().rstrip("\n")
+            self.rows.setdefault(pid, len(self.ids))
+            self.ids.append(pid)
+            self.ids_offset += len(line)
+
+    def _grow(self, size):
+        capacity = max(size, 2 * self.capacity, 1024)
+        matrix = np.memmap(self._path(f"vectors-{capacity}.f32"), dtype=np.float32, mode="w+", shape=(capacity, FEATURE_DIM))
+        meta = np.memmap(self._path(f"meta-{capacity}.bin"), dtype=FEATURE_META_DTYPE, mode="w+", shape=(capacity,))
+        matrix[:self.capacity] = self.matrix[:self.capacity]
+        meta[:self.capacity] = self.meta[:self.capacity]
+        matrix.flush()
+        meta.flush()
+        old = self.capacity
+        self.matrix, self.meta, self.capacity = matrix, meta, capacity
+        self._write_state({**self._read_state(), "capacity": capacity})
+        # Readers still mapping the old files keep them alive until they remap
+        if old:
+            self._path(f"vectors-{old}.f32").unlink(missing_ok=True)
+            self._path(f"meta-{old}.bin").unlink(missing_ok=True)
+
+    async def _pull(self):
+        state = self._read_state()
+        watermark = datetime.fromisoformat(state["watermark"]) if state.get("watermark") else None
+        query = {"feature_vec": {"$ne": None}}
+        if watermark:
+            query["feature_at"] = {"$gt": watermark - timedelta(seconds=FEATURE_REFRESH_OVERLAP_SECONDS)}
+        new_ids = []
+        async for doc in db.job_postings.find(query, {"_id": 0, "posting_id": 1, "feature_vec": 1, "feature_at": 1,
+                                                      "is_remote": 1, "duplicate_of": 1, "first_seen_at": 1}):
+            vec = np.frombuffer(doc["feature_vec"], dtype=np.float32)
+            if vec.shape[0] != FEATURE_DIM:
+                continue
+            row = self.rows.get(doc["posting_id"])
+            if row is None:
+                row = len(self.ids)
+                if row >= self.capacity:
+                    self._grow(row + 1)
+                self.rows[doc["posting_id"]] = row
+                self.ids.append(doc["posting_id"])
+                new_ids.append(doc["posting_id"])
+            self.matrix[row] = vec
+            self.meta[row] = (doc.get("duplicate_of") is None, bool(doc.get("is_remote")), as_utc_timestamp(doc.get("first_seen_at")))
+            feature_at = doc["feature_at"].replace(tzinfo=timezone.utc)
+            watermark = max(watermark or feature_at, feature_at)
+        if new_ids:
+            lines = "".join(f"{pid}\n" for pid in new_ids).encode()
+            with open(self._path("ids.txt"), "ab") as f:
+                f.write(lines)
+            self.ids_offset += len(lines)
+        self._write_state({"capacity": self.capacity, "watermark": watermark.isoformat() if watermark else None})
+
+    async def refresh(self):
+        if time.monotonic() - self.refreshed_at < FEATURE_INDEX_REFRESH_SECONDS:
+            return
+        async with self.lock:
+            if time.monotonic() - self.refreshed_at < FEATURE_INDEX_REFRESH_SECONDS:
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._follow()
+            # The writer lock is held for the life of the process; the OS drops it if that process dies
+            if self._acquire_writer():
+                await self._pull()
+            self.refreshed_at = time.monotonic()
+
+    def rank(self, query_vec, k, remote_only=False, since=None, include=()):
+        """Cosine similarity of the top-k eligible postings, plus any postings named in include."""
+        n = len(self.ids)
+        if not n:
+            return {}
+        sims = self.matrix[:n] @ query_vec
+        meta = self.meta[:n]
+        eligible = meta["active"].copy()
+        if remote_only:
+            eligible &= meta["remote"]
+        if since:
+            eligible &= meta["first_seen"] > as_utc_timestamp(since)
+        masked = np.where(eligible, sims, -np.inf)
+        k = min(k, int(eligible.sum()))
+        top = np.argpartition(-masked, k - 1)[:k] if k else []
+        result = {self.ids[i]: float(sims[i]) for i in top}
+        for pid in include:
+            if pid in self.rows:
+                result[pid] = float(sims[self.rows[pid]])
+        return result
+
+feature_index = FeatureIndex()
+
+def profile_text(profile):
+    return f"{(profile or {}).get('summary') or ''} {(profile or {}).get('resume_text') or ''}".strip()
+
+async def refresh_profile_vector(uid):
+    """Recomputes the stored profile vector; called whenever summary or resume_text changes."""
+    profile = await db.candidate_profiles.find_one({"user_id": uid}, {"_id": 0, "summary": 1, "resume_text": 1})
+    text = profile_text(profile)
+    vec = (await run_parser(compute_search_fields, [("", text)]))[0][2] if text else None
+    await db.candidate_profiles.update_one({"user_id": uid}, {"$set": {"feature_vec": vec}})
+
+def matching_query_vector(prefs, profile):
+    tf = {}
+    for term in search_tokens(" ".join(prefs.get("desired_titles") or [])):
+        tf[term] = tf.get(term, 0) + MATCHING_TITLE_QUERY_WEIGHT
+    vec = hashed_feature_vector(tf)
+    stored = (profile or {}).get("feature_vec")
+    if stored is None and profile_text(profile):
+        stored = compute_search_fields([("", profile_text(profile))])[0][2]  # profiles saved before vectors existed
+    if stored and len(stored) == FEATURE_DIM * 4:
+        vec = vec + np.frombuffer(stored, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else None
+
+def job_content_hash(job):
+    payload = json.dumps({k: job.get(k) for k in JOB_CONTENT_FIELDS}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+async def upsert_job_postings(jobs):
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "errored": 0, "duplicates": 0}
+    # Last occurrence wins when a source emits the same job twice (e.g. overlapping search queries)
+    unique = {(j["source_name"], j["source_job_id"]): j for j in jobs}
+    jobs = list(unique.values())
+    for i in range(0, len(jobs), INGESTION_BULK_BATCH_SIZE):
+        batch = jobs[i:i + INGESTION_BULK_BATCH_SIZE]
+        ids_by_source = {}
+        for job in batch:
+            ids_by_source.setdefault(job["source_name"], []).append(job["source_job_id"])
+        started = time.perf_counter()
+        known_hashes = {}
+        for source_name, ids in ids_by_source.items():
+            async for doc in db.job_postings.find({"source_name": source_name, "source_job_id": {"$in": ids}},
+                                                  {"_id": 0, "source_job_id": 1, "content_hash": 1}):
+                known_hashes[(source_name, doc["source_job_id"])] = doc.get("content_hash")
+
+        content_hashes = [job_content_hash(job) for job in batch]
+        kinds = []
+        for job, content_hash in zip(batch, content_hashes):
+            key = (job["source_name"], job["source_job_id"])
+            if key in known_hashes and known_hashes[key] == content_hash:
+                kinds.append("unchanged")
+            else:
+                kinds.append("updated" if key in known_hashes else "inserted")
+        changed = [job for job, kind in zip(batch, kinds) if kind != "unchanged"]
+        write_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        counts["duplicates"] += await link_near_duplicates(changed)
+        record_phase("dedup", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await attach_search_fields(changed)
+        # Updated postings leave their old terms behind; read them before they are overwritten
+        previous_terms = {}
+        updated = [job for job, kind in zip(batch, kinds) if kind == "updated"]
+        if updated:
+            async for doc in db.job_postings.find({"posting_id": {"$in": [j["posting_id"] for j in updated]}},
+                                                  {"_id": 0, "posting_id": 1, "search_terms": 1, "search_len": 1}):
+                if doc.get("search_len") is not None:
+                    previous_terms[doc["posting_id"]] = (doc.get("search_terms") or [], doc["search_len"])
+        record_phase("index", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        ops = []
+        for job, content_hash, kind in zip(batch, content_hashes, kinds):
+            flt = {"source_name": job["source_name"], "source_job_id": job["source_job_id"]}
+            if kind == "unchanged":
+                ops.append(UpdateOne(flt, {"$set": {"last_seen_at": now}}))
+            else:
+                ops.append(UpdateOne(flt, {"$set": {**job, "content_hash": content_hash, "last_seen_at": now},
+                                           "$setOnInsert": {"first_seen_at": now}}, upsert=True))
+        try:
+            await db.job_postings.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                kinds[err["index"]] = "errored"
+        except Exception as e:
+            print(f"Bulk upsert error: {e}")
+            kinds = ["errored"] * len(kinds)
+        record_phase("write", write_seconds + time.perf_counter() - started)
+
+        started = time.perf_counter()
+        written = [job for job, kind in zip(batch, kinds) if kind in ("inserted", "updated")]
+        await apply_search_deltas([(job["search_terms"], job["search_len"]) for job in written],
+                                  [previous_terms[job["posting_id"]] for job in written if job["posting_id"] in previous_terms])
+        record_phase("index", time.perf_counter() - started)
+        for kind in kinds:
+            counts[kind] += 1
+    return counts
+
+async def load_source_state(name):
+    doc = await db.ingestion_state.find_one({"source": name}, {"_id": 0, "cursor": 1})
+    return {"cursor": doc.get("cursor") if doc else None}
+
+async def save_source_state(name, state):
+    await save_http_validators(list((state.get("validators") or {}).values()))
+    await db.ingestion_state.update_one(
+        {"source": name},
+        {"$set": {"source": name, "cursor": state.get("cursor"), "cursor_updated_at": datetime.now(timezone.utc)}},
+        upsert=True,
+    )
+
+_PAGES_DONE = object()
+
+async def consume_source_pages(fetcher, state, counts):
+    """Write each page as it arrives while the next one is fetched; at most INGESTION_PAGE_BUFFER pages sit in memory."""
+    queue = asyncio.Queue(maxsize=INGESTION_PAGE_BUFFER)
+
+    async def produce():
         try:
-            jobs = await fetcher()
+            async for batch in fetcher(state):
+                await queue.put(batch)
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(_PAGES_DONE)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (batch := await queue.get()) is not _PAGES_DONE:
+            if isinstance(batch, Exception):
+                raise batch
+            counts["fetched"] += len(batch)
+            for kind, n in (await upsert_job_postings(batch)).items():
+                counts[kind] += n
+    finally:
+        producer.cancel()
+
+async def ingest_source(name, fetcher, semaphore):
+    async with semaphore:
+        started_at, started = datetime.now(timezone.utc), time.perf_counter()
+        status, error = "ok", None
+        counts = {"fetched": 0, "inserted": 0, "updated": 0, "unchanged": 0, "errored": 0, "duplicates": 0}
+        run = {"pages": 0, "bytes": 0, **{f"{phase}_seconds": 0.0 for phase in INGESTION_PHASES}}
+        token = current_ingestion_run.set(run)
+        state = await load_source_state(name)
+        try:
+            await asyncio.wait_for(consume_source_pages(fetcher, state, counts), timeout=INGESTION_SOURCE_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"Source {name} timed out after {INGESTION_SOURCE_TIMEOUT}s")
+            status, error = "timed_out", f"Did not finish within {INGESTION_SOURCE_TIMEOUT}s"
         except Exception as e:
             print(f"Source {name} failed: {e}")
-            jobs = []
-        inserted = 0
-        for job in jobs:
-            try:
-                await db.job_postings.update_one(
-                    {"source_name": job["source_name"], "source_job_id": job["source_job_id"]},
-                    {"$set": job}, upsert=True)
-                inserted += 1
-            except Exception:
-                pass
-        all_jobs.extend(jobs)
-        await db.ingestion_runs.insert_one({
-            "run_id": f"run_{uuid.uuid4().hex[:12]}", "source": name,
-            "started_at": datetime.now(timezone.utc), "completed_at": datetime.now(timezone.utc),
-            "fetched_count": len(jobs), "inserted_count": inserted,
-        })
-        sources_results.append({"source": name, "fetched": len(jobs), "inserted": inserted})
-    return {"sources": sources_results, "total_fetched": len(all_jobs)}
+            status, error = "failed", str(e)
+        finally:
+            current_ingestion_run.reset(token)
+        duration = time.perf_counter() - started
+    # Only move the high-water mark once every page below it is safely written
+    if status == "ok" and not counts["errored"]:
+        await save_source_state(name, state)
+    timings = {"duration_ms": round(duration * 1000), "pages_fetched": run["pages"], "bytes_downloaded": run["bytes"],
+               **{f"{phase}_ms": round(run[f"{phase}_seconds"] * 1000) for phase in INGESTION_PHASES}}
+    await db.ingestion_runs.insert_one({
+        "run_id": f"run_{uuid.uuid4().hex[:12]}", "source": name, "status": status, "error": error,
+        "started_at": started_at, "completed_at": datetime.now(timezone.utc), **timings,
+        "fetched_count": counts["fetched"], "inserted_count": counts["inserted"], "updated_count": counts["updated"],
+        "unchanged_count": counts["unchanged"], "errored_count": counts["errored"], "duplicate_count": counts["duplicates"],
+    })
+    INGESTION_RUNS.inc(source=name, status=status)
+    INGESTION_RUN_SECONDS.observe(duration, source=name)
+    for phase in INGESTION_PHASES:
+        INGESTION_PHASE_SECONDS.observe(run[f"{phase}_seconds"], source=name, phase=phase)
+    INGESTION_BYTES.inc(run["bytes"], source=name)
+    for outcome in ("inserted", "updated", "unchanged", "errored", "duplicates"):
+        INGESTION_POSTINGS.inc(counts[outcome], source=name, outcome=outcome)
+    return {"source": name, "status": status, **counts, **timings}
+
+# ── Ingestion Scheduler ──────────────────────────────────
+# Every API process runs the loop, but a per-source lease in ingestion_state guarantees that only
+# one process across the deployment ingests a given source at a time.
+async def acquire_source_lease(name, due_only=True):
+    now = datetime.now(timezone.utc)
+    query = {"source": name, "$or": [{"lease_expires_at": None}, {"lease_expires_at": {"$lt": now}}]}
+    if due_only:
+        query["$and"] = [{"$or": [{"next_run_at": None}, {"next_run_at": {"$lte": now}}]}]
+    await db.ingestion_state.update_one({"source": name}, {"$setOnInsert": {"source": name}}, upsert=True)
+    # Returns the pre-lease state (streaks for backoff), or None when leased elsewhere or not yet due
+    return await db.ingestion_state.find_one_and_update(
+        query,
+        {"$set": {"lease_owner": INSTANCE_ID, "lease_expires_at": now + timedelta(seconds=INGESTION_LEASE_SECONDS)}},
+        projection={"_id": 0}, return_document=ReturnDocument.BEFORE,
+    )
+
+def next_run_delay(name, lease, result):
+    base = SOURCE_CADENCE_SECONDS.get(name, 300)
+    failure_streak, idle_streak = lease.get("failure_streak", 0), lease.get("idle_streak", 0)
+    if result["status"] != "ok":
+        failure_streak += 1
+        delay = base * 2 ** failure_streak
+    elif result.get("inserted", 0) + result.get("updated", 0) == 0:
+        failure_streak, idle_streak = 0, idle_streak + 1
+        delay = base * min(2 ** idle_streak, INGESTION_IDLE_BACKOFF_FACTOR)
+    else:
+        failure_streak, idle_streak = 0, 0
+        delay = base
+    delay = min(delay, INGESTION_MAX_BACKOFF_SECONDS) * random.uniform(0.8, 1.2)
+    return delay, failure_streak, idle_streak
+
+async def release_source_lease(name, lease, result):
+    delay, failure_streak, idle_streak = next_run_delay(name, lease, result)
+    await db.ingestion_state.update_one(
+        {"source": name, "lease_owner": INSTANCE_ID},
+        {"$set": {"lease_owner": None, "lease_expires_at": None, "failure_streak": failure_streak, "idle_streak": idle_streak,
+                  "next_run_at": datetime.now(timezone.utc) + timedelta(seconds=delay), "last_status": result["status"]}},
+    )
+
+async def ingest_source_with_lease(name, fetcher, semaphore, due_only):
+    lease = await acquire_source_lease(name, due_only)
+    if not lease:
+        return None if due_only else {"source": name, "status": "skipped", "fetched": 0}
+    result = {"source": name, "status": "failed", "fetched": 0}
+    try:
+        result = await ingest_source(name, fetcher, semaphore)
+    finally:
+        await release_source_lease(name, lease, result)
+    return result
+
+async def ingest_jobs():
+    # Manual runs fan every source out at once, due or not; a slow or hanging source only costs its own deadline.
+    semaphore = asyncio.Semaphore(INGESTION_CONCURRENCY)
+    sources_results = await asyncio.gather(*(ingest_source_with_lease(name, fetcher, semaphore, False) for name, fetcher in JOB_SOURCES))
+    sources_results = [r for r in sources_results if r]
+    return {"sources": sources_results, "total_fetched": sum(r["fetched"] for r in sources_results)}
+
+async def ingest_due_source(name, fetcher, semaphore):
+    try:
+        result = await ingest_source_with_lease(name, fetcher, semaphore, due_only=True)
+        if result:
+            print(f"Ingestion run: {result}")
+            schedule_background_matching({"sources": [result]})
+    except Exception as e:
+        print(f"Ingestion error ({name}): {e}")
 
 async def ingestion_loop():
+    # Each due source runs as its own task and the tick never waits for them, so a slow source only delays
+    # itself; a source whose previous run is still in flight is not started again
     await asyncio.sleep(5)
+    semaphore = asyncio.Semaphore(INGESTION_CONCURRENCY)
     while True:
-        try:
-            result = await ingest_jobs()
-            print(f"Ingestion cycle: {result}")
-        except Exception as e:
-            print(f"Ingestion error: {e}")
-        await asyncio.sleep(300)
+        for name, fetcher in JOB_SOURCES:
+            task = ingestion_source_tasks.get(name)
+            if task is None or task.done():
+                ingestion_source_tasks[name] = asyncio.create_task(ingest_due_source(name, fetcher, semaphore))
+        await asyncio.sleep(INGESTION_TICK_SECONDS)
 
 @app.post("/api/ingestion/run")
 async def trigger_ingestion(user=Depends(get_current_user)):
-    return await ingest_jobs()
+    result = await ingest_jobs()
+    schedule_background_matching(result)
+    return result
 
 @app.get("/api/ingestion/stats")
 async def ingestion_stats(user=Depends(get_current_user)):
@@ -1073,7 +3154,28 @@ async def ingestion_stats(user=Depends(get_current_user)):
     by_source = {}
     async for doc in db.job_postings.aggregate([{"$group": {"_id": "$source_name", "count": {"$sum": 1}}}]):
         by_source[doc["_id"]] = doc["count"]
-    return {"recent_runs": runs, "total_jobs_indexed": total_jobs, "by_source": by_source}
+    # Per-source averages over recent runs show which source dominates cycle time
+    performance = {}
+    async for doc in db.ingestion_runs.aggregate([
+        {"$sort": {"completed_at": -1}},
+        {"$limit": INGESTION_STATS_RUN_WINDOW},
+        {"$group": {
+            "_id": "$source", "runs": {"$sum": 1}, "last_completed_at": {"$max": "$completed_at"},
+            "avg_duration_ms": {"$avg": "$duration_ms"}, "max_duration_ms": {"$max": "$duration_ms"},
+            "avg_fetch_ms": {"$avg": "$fetch_ms"}, "avg_parse_ms": {"$avg": "$parse_ms"},
+            "avg_dedup_ms": {"$avg": "$dedup_ms"}, "avg_index_ms": {"$avg": "$index_ms"}, "avg_write_ms": {"$avg": "$write_ms"},
+            "bytes_downloaded": {"$sum": "$bytes_downloaded"}, "fetched": {"$sum": "$fetched_count"},
+            "inserted": {"$sum": "$inserted_count"}, "updated": {"$sum": "$updated_count"},
+            "unchanged": {"$sum": "$unchanged_count"}, "errored": {"$sum": "$errored_count"},
+        }},
+    ]):
+        source = doc.pop("_id")
+        performance[source] = {k: round(v) if isinstance(v, float) else v for k, v in doc.items()}
+    return {"recent_runs": runs, "total_jobs_indexed": total_jobs, "by_source": by_source, "source_performance": performance}
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 # ── Health ───────────────────────────────────────────────
 @app.get("/api/health")
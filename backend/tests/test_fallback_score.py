@@ -0,0 +1,69 @@
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import server  # noqa: E402
+
+TITLES = ["Senior Python Engineer", "Data Scientist", "Frontend Developer (React)", "Staff SRE", "ML Engineer II",
+          "Backend Engineer, Payments", "DevOps", "Ingeniero de Software", "Product Designer", ""]
+LOCATIONS = ["Remote", "Remote - US", "Berlin, Germany", "London", "Worldwide", "New York, NY", "", "Remote (EU)"]
+
+
+def random_job(rng, i):
+    return {
+        "posting_id": f"p{i}",
+        "title": rng.choice(TITLES),
+        "location_text": rng.choice(LOCATIONS),
+        "is_remote": rng.choice([True, False, None, 1, 0]),
+    }
+
+
+def random_prefs(rng):
+    return {
+        "desired_titles": rng.sample(["engineer", "Data", "REACT", "sre", "designer", "python engineer", ""], rng.randint(0, 3)),
+        "preferred_locations": rng.sample(["remote", "Berlin", "london", "US", "eu"], rng.randint(0, 3)),
+        "remote_only": rng.choice([True, False, None]),
+    }
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_batch_matches_scalar_for_random_inputs(seed):
+    rng = random.Random(seed)
+    prefs = random_prefs(rng)
+    profile = rng.choice([None, {}, {"resume_text": ""}, {"resume_text": "Ten years of Python"}])
+    jobs = [random_job(rng, i) for i in range(200)]
+    assert server.fallback_score_batch(prefs, profile, jobs) == [server.fallback_score(prefs, profile, job) for job in jobs]
+
+
+def test_first_matching_title_and_location_win():
+    prefs = {"desired_titles": ["Data", "Scientist"], "preferred_locations": ["london", "remote"], "remote_only": True}
+    job = {"title": "Data Scientist", "location_text": "Remote - London", "is_remote": True}
+    result = server.fallback_score_batch(prefs, None, [job])[0]
+    assert result == server.fallback_score(prefs, None, job)
+    assert result["score"] == 90
+    assert [r["detail"] for r in result["reasons"]][::2] == ["Job title matches 'Data'", "Location matches 'london'"]
+
+
+def test_score_is_capped_at_100(monkeypatch):
+    # Every signal fires: 80 + 20 + 10 + 10 + 5 = 125 before the cap
+    monkeypatch.setattr(server, "FALLBACK_BASE_SCORE", 80)
+    prefs = {"desired_titles": ["engineer"], "preferred_locations": ["remote"], "remote_only": True}
+    job = {"title": "Engineer", "location_text": "Remote", "is_remote": True}
+    profile = {"resume_text": "cv"}
+    assert server.fallback_score(prefs, profile, job)["score"] == 100
+    assert server.fallback_score_batch(prefs, profile, [job])[0]["score"] == 100
+    scores = server.fallback_score_arrays(prefs, profile, [job] * 3)[0]
+    assert scores.tolist() == [100, 100, 100]
+
+
+@pytest.mark.parametrize("prefs", [None, {}, {"desired_titles": []}])
+def test_missing_preferences(prefs):
+    jobs = [{"title": "Engineer", "location_text": "Remote", "is_remote": True}]
+    assert server.fallback_score_batch(prefs, None, jobs) == [server.fallback_score(prefs, None, jobs[0])]
+
+
+def test_empty_batch():
+    assert server.fallback_score_batch({"desired_titles": ["x"]}, None, []) == []
@@ -0,0 +1,70 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import ingest_benchmark  # noqa: E402
+import server  # noqa: E402
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(server, "db", ingest_benchmark.MemoryDatabase())
+    monkeypatch.setattr(server, "INGESTION_PAGE_BUDGET", 10)
+    asyncio.run(server.ensure_indexes())
+    yield server.db
+    if server.http_client is not None:
+        asyncio.run(server.http_client.aclose())
+    server.http_client = None
+
+
+def use_upstream(monkeypatch, handler):
+    monkeypatch.setattr(server, "http_client", server.create_http_client(httpx.MockTransport(handler)))
+
+
+def run_source(name, fetcher):
+    return asyncio.run(server.ingest_source(name, fetcher, asyncio.Semaphore(1)))
+
+
+def stored(db, source_name):
+    return len(asyncio.run(db.job_postings.find({"source_name": source_name}).to_list(None)))
+
+
+def test_failed_page_does_not_move_the_mark_past_unread_pages(store, monkeypatch):
+    upstream = ingest_benchmark.SyntheticUpstream(300 * len(server.JOB_SOURCES))
+    outage = {"on": True}
+
+    def handler(request):
+        if outage["on"] and request.url.params.get("page") == "2":
+            return httpx.Response(503)
+        return upstream.handler(request)
+
+    use_upstream(monkeypatch, handler)
+    assert run_source("github_jobs", server.fetch_github_jobs)["status"] == "failed"
+    assert stored(store, "github_jobs") == 100
+    outage["on"] = False
+    assert run_source("github_jobs", server.fetch_github_jobs)["status"] == "ok"
+    assert stored(store, "github_jobs") == 300
+
+
+def test_page_budget_resumes_below_the_last_page_read(store, monkeypatch):
+    use_upstream(monkeypatch, ingest_benchmark.SyntheticUpstream(1500 * len(server.JOB_SOURCES)).handler)
+    first = run_source("github_jobs", server.fetch_github_jobs)
+    assert (first["status"], first["inserted"]) == ("ok", 1000)
+    second = run_source("github_jobs", server.fetch_github_jobs)
+    assert (second["status"], second["inserted"]) == ("ok", 500)
+    assert stored(store, "github_jobs") == 1500
+    # The walk reached the old mark, so the cursor is a plain high-water mark again
+    assert run_source("github_jobs", server.fetch_github_jobs)["fetched"] == 0
+
+
+def test_indeed_budget_resumes_each_query(store, monkeypatch):
+    monkeypatch.setitem(server.SOURCE_PAGE_BUDGETS, "indeed", 3)  # one page per query per run
+    use_upstream(monkeypatch, ingest_benchmark.SyntheticUpstream(180 * len(server.JOB_SOURCES)).handler)
+    for _ in range(4):
+        assert run_source("indeed", server.fetch_indeed_jobs)["status"] == "ok"
+    assert stored(store, "indeed") == 180
+    assert run_source("indeed", server.fetch_indeed_jobs)["fetched"] == 0
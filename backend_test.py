@@ -9,6 +9,7 @@ import requests
 import json
 import sys
 import io
+import time
 from datetime import datetime
 
 class EZJobAPITester:
@@ -155,7 +156,16 @@ class EZJobAPITester:
     def test_run_matching(self):
         """Test POST /api/matching/run"""
         self.log("⚠️ Matching uses LLM and may take time")
-        return self.run_test("Run LLM Matching", "POST", "api/matching/run", 200)
+        success, response = self.run_test("Run LLM Matching", "POST", "api/matching/run", 200)
+        if success and response.get('job_id'):
+            # Matching runs in the background; poll the handle until it settles
+            for _ in range(30):
+                ok, job = self.run_test("Poll Matching Job", "GET", f"api/matching/jobs/{response['job_id']}", 200)
+                if not ok or job.get('status') in ('done', 'failed'):
+                    self.log(f"Matching job finished: {job.get('status')} {job.get('result')}")
+                    return ok and job.get('status') == 'done'
+                time.sleep(2)
+        return success
 
     def test_get_matches(self):
         """Test GET /api/matches"""
@@ -193,6 +203,9 @@ class EZJobAPITester:
                     
                     # Test getting cover letter status
                     self.test_get_cover_letter(attempt_id)
+
+                    # Test streaming the cover letter over SSE
+                    self.test_stream_cover_letter(attempt_id)
                     
                     # Test generating cover letter on demand
                     self.test_generate_cover_letter_by_attempt(attempt_id)
@@ -224,6 +237,37 @@ class EZJobAPITester:
                 self.log("Cover letter: None (may still be generating)")
         return success
 
+    def test_stream_cover_letter(self, attempt_id):
+        """Test GET /api/applications/{attempt_id}/cover-letter/stream (server-sent events)"""
+        name = "Stream Cover Letter"
+        self.tests_run += 1
+        self.log(f"Testing {name} - GET api/applications/{attempt_id}/cover-letter/stream")
+        try:
+            started = time.time()
+            first_event_at, events, cover_letter = None, [], None
+            with requests.get(f"{self.base_url}/api/applications/{attempt_id}/cover-letter/stream",
+                              headers={'Authorization': f'Bearer {self.session_token}'}, stream=True, timeout=90) as response:
+                if response.status_code != 200:
+                    raise Exception(f"Expected 200, got {response.status_code}")
+                event = None
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith("event: "):
+                        event = line[7:]
+                        events.append(event)
+                        first_event_at = first_event_at or time.time()
+                    elif line.startswith("data: ") and event == "done":
+                        cover_letter = json.loads(line[6:]).get("cover_letter")
+                        break
+            if events[:1] != ["status"] or not cover_letter:
+                raise Exception(f"Unexpected event sequence: {events[:5]}")
+            self.tests_passed += 1
+            self.log(f"PASS - first event after {first_event_at - started:.2f}s, {events.count('chunk')} chunks, {len(cover_letter)} characters", True)
+            return True
+        except Exception as e:
+            self.failures.append(f"{name}: {e}")
+            self.log(f"FAIL - {e}", False)
+            return False
+
     def test_generate_cover_letter_by_attempt(self, attempt_id):
         """Test POST /api/cover-letter/generate with attempt_id"""
         success, response = self.run_test("Generate Cover Letter (by attempt)", "POST", f"api/cover-letter/generate?attempt_id={attempt_id}", 200)
@@ -393,6 +437,16 @@ startxref
             total_jobs = response.get('total_jobs_indexed', 0)
             self.log(f"Jobs by source: {by_source}")
             self.log(f"Total indexed: {total_jobs}")
+            for source, perf in response.get('source_performance', {}).items():
+                self.log(f"{source}: avg {perf.get('avg_duration_ms')}ms (fetch {perf.get('avg_fetch_ms')}ms, "
+                         f"parse {perf.get('avg_parse_ms')}ms, write {perf.get('avg_write_ms')}ms)")
+        return success
+
+    def test_search_jobs(self):
+        """Test GET /api/jobs/search - indexed title keyword search"""
+        success, response = self.run_test("Search Jobs by Title", "GET", "api/jobs/search?q=software%20engineer&limit=10", 200)
+        if success:
+            self.log(f"Search returned {len(response.get('jobs', []))} jobs")
         return success
 
     def test_analytics(self):
@@ -453,6 +507,7 @@ startxref
         self.log("\n🔄 Testing 6-Source Job Ingestion...")
         self.test_ingestion_with_sources()
         self.test_ingestion_stats()
+        self.test_search_jobs()
         
         # LLM matching (now with resume support)
         self.log("\n🧠 Testing LLM Matching (with resume support)...")
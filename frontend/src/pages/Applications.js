@@ -8,35 +8,30 @@ function CoverLetterPanel({ attempt, onRegenerate }) {
   const [expanded, setExpanded] = useState(false);
   const [regenerating, setRegenerating] = useState(false);
   const [copied, setCopied] = useState(false);
-  const [polling, setPolling] = useState(status === 'generating');
+
+  const stream = (refresh) => {
+    if (refresh) setRegenerating(true);
+    let text = '';
+    return api.streamCoverLetter(attempt.attempt_id, {
+      refresh,
+      onChunk: (chunk) => { text += chunk; setLetter(text); setStatus('ready'); },
+      onDone: (full) => { setLetter(full); setStatus('ready'); setRegenerating(false); },
+      onError: (e) => {
+        if (refresh) alert(e.message);
+        else if (!text) setStatus('failed');
+        setRegenerating(false);
+      },
+    });
+  };
 
   useEffect(() => {
     if (status !== 'generating') return;
-    const timer = setInterval(async () => {
-      try {
-        const res = await api.getCoverLetter(attempt.attempt_id);
-        if (res.status === 'ready' && res.cover_letter) {
-          setLetter(res.cover_letter);
-          setStatus('ready');
-          setPolling(false);
-        } else if (res.status === 'failed') {
-          setStatus('failed');
-          setPolling(false);
-        }
-      } catch {}
-    }, 3000);
-    return () => clearInterval(timer);
-  }, [status, attempt.attempt_id]);
-
-  const regenerate = async () => {
-    setRegenerating(true);
-    try {
-      const res = await api.generateCoverLetter(null, attempt.attempt_id);
-      setLetter(res.cover_letter);
-      setStatus('ready');
-    } catch (e) { alert(e.message); }
-    setRegenerating(false);
-  };
+    const source = stream(false);
+    return () => source.close();
+  // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [attempt.attempt_id]);
+
+  const regenerate = () => stream(true);
 
   const copyToClipboard = async () => {
     if (!letter) return;
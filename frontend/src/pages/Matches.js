@@ -49,7 +49,8 @@ export default function Matches() {
   const runMatch = async () => {
     setMatching(true);
     try {
-      const result = await api.runMatching();
+      const handle = await api.runMatching();
+      const result = await api.waitForMatchingJob(handle.job_id);
       alert(`Created ${result.matches_created} new matches!`);
       load();
     } catch (e) { alert(e.message); }
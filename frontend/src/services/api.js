@@ -27,8 +27,18 @@ export const api = {
   getApplications: () => fetch(`${API_URL}/api/applications`, { credentials: 'include' }).then(handleResponse),
   markApplied: (attemptId) => fetch(`${API_URL}/api/applications/${attemptId}/mark-applied`, { method: 'POST', credentials: 'include' }).then(handleResponse),
   runMatching: () => fetch(`${API_URL}/api/matching/run`, { method: 'POST', credentials: 'include' }).then(handleResponse),
+  getMatchingJob: (jobId) => fetch(`${API_URL}/api/matching/jobs/${jobId}`, { credentials: 'include' }).then(handleResponse),
+  waitForMatchingJob: async (jobId, intervalMs = 2000) => {
+    for (;;) {
+      const job = await api.getMatchingJob(jobId);
+      if (job.status === 'done') return job.result;
+      if (job.status === 'failed') throw new Error(job.error || 'Matching failed');
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+  },
   triggerIngestion: () => fetch(`${API_URL}/api/ingestion/run`, { method: 'POST', credentials: 'include' }).then(handleResponse),
   getJobs: (limit = 50, skip = 0) => fetch(`${API_URL}/api/jobs?limit=${limit}&skip=${skip}`, { credentials: 'include' }).then(handleResponse),
+  searchJobs: (q, limit = 50, skip = 0) => fetch(`${API_URL}/api/jobs/search?q=${encodeURIComponent(q)}&limit=${limit}&skip=${skip}`, { credentials: 'include' }).then(handleResponse),
 
   // Resume
   uploadResume: (file) => {
@@ -46,6 +56,15 @@ export const api = {
 
   // Cover letter
   getCoverLetter: (attemptId) => fetch(`${API_URL}/api/applications/${attemptId}/cover-letter`, { credentials: 'include' }).then(handleResponse),
+  // Server-sent events: onStatus/onChunk as the letter arrives, onDone with the full text; returns the EventSource
+  streamCoverLetter: (attemptId, { refresh = false, onStatus, onChunk, onDone, onError } = {}) => {
+    const source = new EventSource(`${API_URL}/api/applications/${attemptId}/cover-letter/stream${refresh ? '?refresh=true' : ''}`, { withCredentials: true });
+    source.addEventListener('status', (e) => onStatus && onStatus(JSON.parse(e.data).status));
+    source.addEventListener('chunk', (e) => onChunk && onChunk(JSON.parse(e.data).text));
+    source.addEventListener('done', (e) => { source.close(); onDone && onDone(JSON.parse(e.data).cover_letter); });
+    source.onerror = () => { source.close(); onError && onError(new Error('Cover letter stream failed')); };
+    return source;
+  },
   generateCoverLetter: (matchId, attemptId) => {
     const params = new URLSearchParams();
     if (matchId) params.set('match_id', matchId);